@@ -11,6 +11,8 @@ import json
 import logging
 import random
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import socket
 import ssl
 import sys
@@ -18,9 +20,10 @@ import threading
 import time
 import websocket
 import websocket._exceptions as ws_exceptions
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from queue import Queue, Empty
-from typing import Dict, Any, Optional, Callable, Union, List
+from typing import Dict, Any, Optional, Callable, Union, List, Iterable, Iterator
 from urllib.parse import urlparse, urlunparse
 
 # Import local modules
@@ -29,7 +32,35 @@ from .config import get_config
 
 config = get_config()
 
+logger = logging.getLogger(__name__)
+
+# File extensions (lower case) of G-code files treated as macros
+_MACRO_EXTS = frozenset(('.gcode', '.nc', '.tap', '.ngc'))
+
+try:
+    import orjson
+except ImportError:  # Optional: faster decoding of controller messages
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the latter
+_loads = orjson.loads if orjson is not None else json.loads
+
 class BBCtrlCommunicator:
+    # Largest websocket frame send_gcode_batch packs commands into
+    MAX_WRITE_BYTES = 64
+    # Chunk size for streamed file transfers
+    STREAM_CHUNK_SIZE = 32768
+    # Largest macro file read into memory while syncing macros
+    MAX_READ_BYTES = 16 * 1024 * 1024
+    # Leading bytes of a macro file searched for its description
+    DESCRIPTION_BYTES = 2048
+    # Concurrent REST requests while searching the controller for macros
+    MACRO_SCAN_WORKERS = 8
+    # Seconds a directory listing is reused before the controller is asked again
+    DIR_CACHE_TTL = 2.0
+    # Minimum seconds between state callback notifications
+    STATE_CALLBACK_INTERVAL = 0.05
+
     def __init__(self, host=None, port=None, callback_scheduler=None):
         # Connection settings
         self.host = host if host is not None else config.get('connection.host')
@@ -49,6 +80,15 @@ class BBCtrlCommunicator:
 
         # Set up base URL for REST API calls
         self.base_url = f'{http_scheme}://{self.host}' if self.port in [80, 443] else f'{http_scheme}://{self.host}:{self.port}'
+        # Every REST call goes through the session, so keep its connections
+        # to the controller alive between requests. The pool holds one
+        # connection per concurrent macro search request; failed connects are
+        # retried, but requests the controller may have received are not.
+        self.session.mount(self.base_url, HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.MACRO_SCAN_WORKERS,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1),
+        ))
 
         # Set up WebSocket URL - ensure proper formatting for IP addresses and hostnames
         if '://' in str(self.host):
@@ -66,10 +106,19 @@ class BBCtrlCommunicator:
                 self.ws_url = f'{ws_scheme}://{ws_host}/websocket'
             else:
                 self.ws_url = f'{ws_scheme}://{ws_host}:{self.port}/websocket'
-        print(f"DEBUG: BBCtrlCommunicator initialized with host: {self.host}, port: {self.port}")
+
+        # TLS options for wss connections, built once and reused on reconnects.
+        # The controller uses a self-signed certificate, so it is not verified.
+        self._sslopt = {}
+        if self.ws_url.startswith('wss'):
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+            self._sslopt = {"context": ssl_context}
+        logger.debug("BBCtrlCommunicator initialized with host: %s, port: %s", self.host, self.port)
 
         # Thread safety
-        self._lock = threading.RLock()
+        self._lock = threading.Lock()
         self._stop_event = threading.Event()
         self._main_thread_id = threading.get_ident()
 
@@ -77,11 +126,11 @@ class BBCtrlCommunicator:
         self.connected = False
         self._reconnect_attempts = 0
         self._stopping = False
-        self._reconnect_timer = None
-        self.keepalive_thread = None
+        # time.monotonic() before which _run_websocket will not connect again
+        self._next_reconnect = 0.0
         self.ws_thread = None
         self.ws = None
-        self.last_message_time = time.time()
+        self.last_message_time = time.monotonic()  # Monotonic time of the last controller message
         self.connection_attempts = 0
         self.last_connection_attempt = 0
         self._max_reconnect_attempts = 10  # Maximum number of reconnection attempts
@@ -95,10 +144,31 @@ class BBCtrlCommunicator:
         self.message_callback = None
         self.error_callback = None
         self._callback_scheduler = callback_scheduler
+        # Display names of the registered callbacks, resolved once in set_callbacks
+        self._callback_names: Dict[Callable, str] = {}
+        # Set when last_state has changed since the state callback last ran
+        self._state_dirty = False
+        # Set while a _deliver_state call is waiting in the callback scheduler
+        self._state_scheduled = False
+        # time.monotonic() of the last state notification, and the timer for a
+        # notification held back by STATE_CALLBACK_INTERVAL
+        self._state_last_emit = 0.0
+        self._state_timer = None
+
+        # Macro descriptions by (path, modified time) of the file they came from
+        self._desc_cache: Dict[tuple, str] = {}
+        # Recent directory listings by path, as (time.monotonic(), files)
+        self._dir_cache: Dict[str, tuple] = {}
 
         # State tracking
         self.last_state = {}
         self.message_counter = 1
+        # Set when the controller returns to READY after leaving it since the
+        # last send_gcode, i.e. it has finished that command; MacroExecutor
+        # waits on it instead of the full fixed delay.
+        self.ready_event = threading.Event()
+        # Whether a state other than READY was reported since the last send
+        self._busy_since_send = False
 
         # MSG/DEBUG handler for local processing
         self.msg_debug_handler = MsgDebugHandler(self._handle_msg_debug_output)
@@ -106,13 +176,12 @@ class BBCtrlCommunicator:
 
     def _on_close(self, ws, close_status_code, close_msg):
         """Handle WebSocket connection close."""
-        print(f"[INFO] WebSocket connection closed. Code: {close_status_code}, Msg: '{close_msg}'")
+        logger.info("WebSocket connection closed. Code: %s, Msg: '%s'", close_status_code, close_msg)
         self.connected = False
         self._call_callback(self.state_callback, {'connected': False})
 
         # Clean up the WebSocket instance
-        if hasattr(self, 'ws'):
-            self.ws = None
+        self.ws = None
 
     def _on_error(self, ws, error):
         """Handle WebSocket errors."""
@@ -125,13 +194,10 @@ class BBCtrlCommunicator:
         elif isinstance(error, socket.gaierror):
             error_details += f" (Hostname resolution failed for {self.host})"
 
-        print(f"[ERROR] {error_details}")
+        logger.error("%s", error_details)
         self.connected = False
         self._call_callback(self.error_callback, error_msg)
-
-        # Attempt to reconnect if not already stopping
-        if not self._stopping and self._should_reconnect():
-            self._schedule_reconnect()
+        # run_forever returns after an error and _run_websocket reconnects
 
     def _should_reconnect(self):
         # Implement your reconnect logic here
@@ -145,6 +211,16 @@ class BBCtrlCommunicator:
             self.message_callback = message_callback
         if error_callback:
             self.error_callback = error_callback
+        self._callback_names = {
+            callback: self._callback_name(callback)
+            for callback in (self.state_callback, self.message_callback, self.error_callback)
+            if callback is not None
+        }
+
+    @staticmethod
+    def _callback_name(callback) -> str:
+        """Return a display name for a callback, for log messages."""
+        return getattr(callback, '__name__', None) or type(callback).__name__
 
     def _call_callback(self, callback, *args):
         """Safely call a callback function with the provided arguments.
@@ -156,201 +232,118 @@ class BBCtrlCommunicator:
             callback: The callback function to call
             *args: Arguments to pass to the callback
         """
+        callback_name = 'anonymous'
         try:
-            # Get current thread info for debugging
-            current_thread = threading.current_thread()
-            thread_name = getattr(current_thread, 'name', 'unnamed')
-            thread_id = getattr(current_thread, 'ident', 'unknown')
-
             # Basic validation
             if callback is None:
-                print(f"WARNING: Attempted to call None callback from thread {thread_name} ({thread_id})")
+                logger.warning("Attempted to call None callback from thread %s",
+                               threading.current_thread().name)
                 return
 
             if not callable(callback):
-                print(f"WARNING: Callback is not callable: {callback} (type: {type(callback).__name__})")
+                logger.warning("Callback is not callable: %r (type: %s)", callback, type(callback).__name__)
                 return
 
-            # Safely get callback name for logging
-            callback_name = 'anonymous'
-            try:
-                if hasattr(callback, '__name__') and callback.__name__:
-                    callback_name = callback.__name__
-                elif hasattr(callback, '__class__') and hasattr(callback, '__call__'):
-                    callback_name = callback.__class__.__name__
-            except Exception as e:
-                print(f"WARNING: Could not determine callback name: {e}")
+            callback_name = self._callback_names.get(callback) or self._callback_name(callback)
 
-            args_str = ', '.join(repr(arg) for arg in args)
-            if callback == self.state_callback and self.debug_state_changes:
-                print(f"DEBUG: _call_callback for {callback_name}({args_str}) from thread {thread_name} ({thread_id})")
+            debug_call = (self.debug_state_changes and callback == self.state_callback
+                          and logger.isEnabledFor(logging.DEBUG))
+            if debug_call:
+                logger.debug("_call_callback for %s(%s) from thread %s", callback_name,
+                             ', '.join(repr(arg) for arg in args), threading.current_thread().name)
 
             # Check if we need to schedule this on the main thread
             if self._callback_scheduler:
                 try:
-                    if callback == self.state_callback and self.debug_state_changes:
-                        print(f"DEBUG: Scheduling callback {callback_name} on main thread")
+                    if debug_call:
+                        logger.debug("Scheduling callback %s on main thread", callback_name)
                     self._callback_scheduler(callback, *args)
-                except Exception as e:
-                    error_msg = f"Error scheduling callback {callback_name}: {str(e)}"
-                    print(f"CRITICAL: {error_msg}")
-                    import traceback
-                    traceback.print_exc()
+                except Exception:
+                    logger.exception("Error scheduling callback %s", callback_name)
             else:
                 try:
-                    print(f"DEBUG: Directly invoking {callback_name}")
-                    # Add a small delay to prevent thread congestion
-                    time.sleep(0.001)
                     callback(*args)
-                    print(f"DEBUG: Successfully completed {callback_name}")
                 except Exception as e:
                     error_msg = f"Error in callback {callback_name}: {str(e)}"
-                    print(f"ERROR: {error_msg}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("%s", error_msg)
 
                     # If we have an error callback and it's not the source of the error
-                    if hasattr(self, 'error_callback') and self.error_callback and self.error_callback != callback:
+                    if self.error_callback is not None and self.error_callback != callback:
                         try:
                             self.error_callback(f"Callback error: {error_msg}")
-                        except Exception as err:
-                            print(f"CRITICAL: Error in error callback: {err}")
+                        except Exception:
+                            logger.exception("Error in error callback")
 
         except Exception as e:
             error_msg = f"Critical error in _call_callback for {callback_name}: {str(e)}"
-            print(f"CRITICAL: {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("%s", error_msg)
 
             # Last resort error handling
             try:
-                if hasattr(self, 'error_callback') and self.error_callback and self.error_callback != callback:
+                if self.error_callback is not None and self.error_callback != callback:
                     self.error_callback(f"Critical error: {error_msg}")
-            except Exception as err:
-                print(f"CRITICAL: Failed to call error handler: {err}")
+            except Exception:
+                logger.exception("Failed to call error handler")
 
             # Don't propagate the error to avoid crashing the WebSocket thread
 
-    def _handle_msg_debug_output(self, msg_type: str, content: str):
-        """Handle MSG/DEBUG output from local processing."""
-        formatted_message = f"[{msg_type}] {content}"
-        self._call_callback(self.message_callback, formatted_message)
-
-    def connect_websocket(self):
-        """Connect to the WebSocket for real-time communication."""
-        if self.connected or (self.ws_thread and self.ws_thread.is_alive()):
-            print("[DEBUG] WebSocket already connected or connecting.")
-            return True
-
-        if not self._connection_lock.acquire(blocking=False):
-            print("[DEBUG] Connection attempt already in progress.")
-            return True
-
-        try:
-            self._stopping = False
+    def _schedule_state(self):
+        """Schedule _deliver_state unless a delivery is already pending."""
+        with self._lock:
+            if self._state_scheduled:
+                return
+            self._state_scheduled = True
+        self._callback_scheduler(self._deliver_state)
 
-            # The thread is started here and handles everything else.
-            self.ws_thread = threading.Thread(target=self._run_websocket, name="WebSocketThread", daemon=True)
-            self.ws_thread.start()
-            return True
-        except Exception as e:
-            print(f"[ERROR] Error initiating WebSocket connection: {e}")
-            self._call_callback(self.error_callback, f"Failed to connect: {e}")
-            return False
-        finally:
-            self._connection_lock.release()
+    def _deliver_state(self):
+        """Run the state callback on the scheduler's thread.
 
-    def _run_websocket(self):
-        """Run the WebSocket client in a loop with enhanced error handling."""
-        while not self._stopping:
+        State updates arriving while this call is pending are delivered
+        together, as one snapshot.
+        """
+        with self._lock:
+            self._state_scheduled = False
+        state = self._take_state()
+        if state is not None and self.state_callback:
             try:
-                print(f"[DEBUG] Creating new WebSocketApp instance for {self.ws_url}")
-                print(f"[DEBUG] Connection settings - Host: {self.host}, Port: {self.port}, URL: {self.ws_url}")
-
-                # Validate host before attempting to connect
-                if not self.host:
-                    raise ValueError("No host specified for WebSocket connection")
-
-                self.ws = websocket.WebSocketApp(
-                    self.ws_url,
-                    on_open=self._on_open,
-                    on_message=self._on_message,
-                    on_error=self._on_error,
-                    on_close=self._on_close
-                )
-
-                sslopt = {"cert_reqs": ssl.CERT_NONE} if self.ws_url.startswith('wss') else {}
-
-                print(f"[DEBUG] Starting WebSocket connection to {self.ws_url}")
-                print(f"[DEBUG] Thread: {threading.current_thread().name} (ID: {threading.get_ident()})")
-
-                # Add timeout to the WebSocket connection
-                self.ws.run_forever(
-                    sslopt=sslopt,
-                    ping_interval=30,
-                    ping_timeout=10,
-                    ping_payload='{"ping":1}'
-                )
-            except Exception as e:
-                print(f"[ERROR] An unexpected error occurred in run_forever: {e}")
-                self._on_error(self.ws, e)
-
-            if not self._stopping:
-                self._reconnect_attempts += 1
-                if self._reconnect_attempts > self._max_reconnect_attempts:
-                    print("[ERROR] Maximum reconnect attempts reached. Giving up.")
-                    self._call_callback(self.error_callback, "Connection failed after multiple retries.")
-                    break
-
-                delay = min(self._reconnect_delay * (2 ** self._reconnect_attempts), self._max_reconnect_delay)
-                print(f"[INFO] Attempting to reconnect in {delay} seconds...")
-                time.sleep(delay)
-
-        print("[DEBUG] WebSocket thread exiting")
-
-    def _on_ping(self, ws, message):
-        """Handle WebSocket ping frame."""
-        print("[DEBUG] Received ping from server")
-        try:
-            # Send pong response
-            if hasattr(ws, 'sock') and ws.sock:
-                ws.sock.pong(message)
-                print("[DEBUG] Sent pong response")
-        except Exception as e:
-            print(f"[ERROR] Error sending pong: {e}")
-
-    def _on_pong(self, ws, message):
-        """Handle WebSocket pong frame."""
-        # Update last message time to prevent timeout
-        self.last_message_time = time.time()
-        print("[DEBUG] Received pong from server")
+                self.state_callback(state)
+            except Exception:
+                logger.exception("Error in callback %s",
+                                 self._callback_names.get(self.state_callback)
+                                 or self._callback_name(self.state_callback))
+
+    def _take_state(self) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of last_state if it changed since the last one, else None."""
+        with self._lock:
+            if not self._state_dirty:
+                return None
+            self._state_dirty = False
+            return dict(self.last_state)
 
     def _request_state(self):
         """Request the current state from the controller via REST API."""
         try:
             url = f"{self.base_url}/api/state"
-            print(f"[DEBUG] Requesting state from {url}")
+            logger.debug("Requesting state from %s", url)
 
             response = self.session.get(url, timeout=5)
             response.raise_for_status()
 
-            state = response.json()
+            state = _loads(response.content)
             if state:
                 self._update_state(state)
                 return True
 
         except requests.exceptions.RequestException as e:
-            print(f"[WARNING] Error getting state: {e}")
-        except Exception as e:
-            print(f"[ERROR] Unexpected error in _request_state: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Error getting state: %s", e)
+        except Exception:
+            logger.exception("Unexpected error in _request_state")
 
         return False
 
     def _on_open(self, ws):
         """Handle WebSocket connection open."""
-        print("DEBUG: WebSocket connection established")
+        logger.debug("WebSocket connection established")
         self.connected = True
         self._reconnect_attempts = 0
         self._reconnect_delay = 1
@@ -367,16 +360,19 @@ class BBCtrlCommunicator:
     def connect_websocket(self):
         """Connect to the WebSocket for real-time communication."""
         if self.connected or (self.ws_thread and self.ws_thread.is_alive()):
-            print("[DEBUG] WebSocket already connected or connecting.")
+            logger.debug("WebSocket already connected or connecting.")
             return True
 
         if not self._connection_lock.acquire(blocking=False):
-            print("[DEBUG] Connection attempt already in progress.")
+            logger.debug("Connection attempt already in progress.")
             return True
 
         try:
             self._stopping = False
-            print(f"[DEBUG] Starting WebSocket connection to {self.ws_url}")
+            self._stop_event.clear()
+            self._next_reconnect = 0.0
+            self._reconnect_delay = 1
+            logger.debug("Starting WebSocket connection to %s", self.ws_url)
 
             # The thread is started here and handles everything else.
             self.ws_thread = threading.Thread(
@@ -387,18 +383,30 @@ class BBCtrlCommunicator:
             self.ws_thread.start()
             return True
         except Exception as e:
-            print(f"[ERROR] Error initiating WebSocket connection: {e}")
+            logger.exception("Error initiating WebSocket connection")
             self._call_callback(self.error_callback, f"Failed to connect: {e}")
             return False
         finally:
             self._connection_lock.release()
 
     def _run_websocket(self):
-        """Run the WebSocket client in a loop with enhanced error handling."""
+        """Run the WebSocket client in a loop with enhanced error handling.
+
+        Connection attempts are rate limited: each one pushes the next
+        allowed attempt _reconnect_delay seconds out and doubles the delay
+        (up to _max_reconnect_delay) until a connection opens again.
+        """
         while not self._stopping:
+            # close() interrupts the wait
+            wait = self._next_reconnect - time.monotonic()
+            if wait > 0 and self._stop_event.wait(wait):
+                break
+            self._next_reconnect = time.monotonic() + self._reconnect_delay
+            self._reconnect_delay = min(self._reconnect_delay * 2, self._max_reconnect_delay)
+
             try:
-                print(f"[DEBUG] Creating new WebSocketApp instance for {self.ws_url}")
-                print(f"[DEBUG] Connection settings - Host: {self.host}, Port: {self.port}")
+                logger.debug("Creating new WebSocketApp instance for %s (host: %s, port: %s)",
+                             self.ws_url, self.host, self.port)
 
                 # Validate host before attempting to connect
                 if not self.host:
@@ -412,159 +420,169 @@ class BBCtrlCommunicator:
                     on_close=self._on_close
                 )
 
-                sslopt = {"cert_reqs": ssl.CERT_NONE} if self.ws_url.startswith('wss') else {}
-
-                # Add timeout to the WebSocket connection
+                # Commands are small frames, so never hold them back for
+                # Nagle. Skip the library's UTF-8 validation pass; text
+                # frames then arrive as bytes, which _on_message decodes.
                 self.ws.run_forever(
-                    sslopt=sslopt,
+                    sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                    sslopt=self._sslopt,
                     ping_interval=30,
                     ping_timeout=10,
-                    ping_payload='{"ping":1}'
+                    ping_payload='{"ping":1}',
+                    skip_utf8_validation=True
                 )
 
                 # If we get here, the connection was closed
-                print("[INFO] WebSocket connection closed")
+                logger.info("WebSocket connection closed")
                 self.connected = False
                 self._call_callback(self.state_callback, {'connected': False})
 
-                # Add a small delay before attempting to reconnect
-                time.sleep(1)
-
-            except Exception as e:
-                print(f"[ERROR] An unexpected error occurred in WebSocket: {e}")
+            except Exception:
+                logger.exception("An unexpected error occurred in WebSocket")
                 self.connected = False
                 self._call_callback(self.state_callback, {'connected': False})
 
-                # Add a delay before retrying
-                time.sleep(2)
-
             # Attempt to reconnect if not stopping
-            if not self._stopping and self._should_reconnect():
-                print("[INFO] Attempting to reconnect...")
-                time.sleep(min(self._reconnect_delay * 2, 60))  # Exponential backoff with max 60s
-            else:
+            if self._stopping or not self._should_reconnect():
                 break
-
-    def _start_keepalive(self):
-        """Start the keepalive thread that sends periodic pings to keep the connection alive."""
-        if self.keepalive_thread and self.keepalive_thread.is_alive():
-            return
-
-        self._stop_event.clear()
-
-        def keepalive_loop():
-            while not self._stop_event.is_set() and self.connected:
-                try:
-                    # Wait at least 30 s since the last controller message before pinging
-                    time_since_last_message = time.time() - self.last_message_time
-                    if time_since_last_message > 30:  # 30-second inactivity threshold
-                        if hasattr(self, 'ws') and self.ws and self.connected and hasattr(self.ws, 'sock') and self.ws.sock:
-                            print("[DEBUG] Sending WebSocket PING frame for keep-alive")
-                            try:
-                                # Send a native WebSocket PING frame instead of a text message
-                                self.ws.sock.ping(b'keepalive')
-                                # Reset timer so we do not spam pings if no traffic
-                                self.last_message_time = time.time()
-                            except Exception as e:
-                                print(f"[WARNING] Failed to send keepalive PING: {e}")
-                                # Force a reconnect on ping failure
-                                self.connected = False
-                                break
-                except Exception as e:
-                    print(f"[ERROR] Error in keepalive thread: {e}")
-
-                # Sleep for 5 seconds before next check
-                self._stop_event.wait(5)
-
-        self.keepalive_thread = threading.Thread(
-            target=keepalive_loop,
-            name="WebSocketKeepaliveThread",
-            daemon=True
-        )
-        self.keepalive_thread.start()
-
-    def _stop_keepalive(self):
-        """Stop the keepalive thread."""
-        self._stop_event.set()
-        if self.keepalive_thread and self.keepalive_thread.is_alive():
-            self.keepalive_thread.join(timeout=2.0)
+            logger.info("Attempting to reconnect...")
 
     def _on_message(self, ws, message):
         """Handle incoming WebSocket messages."""
-        if not hasattr(self, '_main_thread_id'):
-            print("[ERROR] _main_thread_id not set in _on_message")
-            return
-
         try:
-            self.last_message_time = time.time()
+            self.last_message_time = time.monotonic()
+
+            # Without UTF-8 validation, run_forever passes text frames as bytes
+            if isinstance(message, bytes):
+                message = message.decode('utf-8', 'replace')
 
             # Skip empty messages
-            if not message or not message.strip():
+            if not message or message.isspace():
+                return
+
+            # Heartbeats carry no state; recognise the controller's compact
+            # {"heartbeat":N} frames without parsing them
+            if (message.startswith('{"heartbeat":')
+                    and message.endswith('}') and ',' not in message):
+                self._on_heartbeat(message[13:-1].strip())
                 return
 
             # Parse JSON message
             try:
-                data = json.loads(message)
+                data = _loads(message)
             except json.JSONDecodeError:
                 # Not JSON, could be a simple text message
                 if self.message_callback:
                     self._call_callback(self.message_callback, message)
                 return
 
+            if type(data) is not dict:
+                return
+
             # Check for error logs from the server
-            if isinstance(data, dict) and 'log' in data and data['log'].get('level') == 'error':
-                error_msg = f"Controller error: {data['log'].get('msg', 'Unknown error')}"
+            log = data.get('log')
+            if log and log.get('level') == 'error':
+                error_msg = f"Controller error: {log.get('msg', 'Unknown error')}"
                 if self.error_callback:
                     self._call_callback(self.error_callback, error_msg)
                 return
 
-            # Update state
-            self._update_state(data)
-
             # Only forward concise messages to the UI to avoid huge dumps that
             # can crash Tk. Skip full-state dicts; just show heartbeats.
-            if isinstance(data, dict) and data.keys() == {'heartbeat'}:
-                self._request_state()  # Poll full status on heartbeat
-                if self.message_callback:
-                    self._call_callback(self.message_callback,
-                                     f"Heartbeat: {data['heartbeat']}")
+            if len(data) == 1 and 'heartbeat' in data:
+                self._on_heartbeat(data['heartbeat'])
+                return
+
+            # Update state
+            self._update_state(data)
 
         except Exception as e:
             error_msg = f"Error processing WebSocket message: {e}"
-            print(f"[ERROR] {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("%s", error_msg)
             if self.error_callback:
                 self._call_callback(self.error_callback, error_msg)
 
+    def _on_heartbeat(self, value):
+        """Poll the full state and report a controller heartbeat."""
+        self._request_state()  # Poll full status on heartbeat
+        if self.message_callback:
+            self._call_callback(self.message_callback, f"Heartbeat: {value}")
+
     def _update_state(self, data):
         """Update the internal state with new data from the controller."""
         if not isinstance(data, dict):
             return
 
         # Update last_state with the new data
-        self._merge_state(self.last_state, data)
+        with self._lock:
+            self._merge_state(self.last_state, data)
+            self._state_dirty = True
+            xx = data.get('xx')
+            if xx is not None:
+                if xx != 'READY':
+                    self._busy_since_send = True
+                elif self._busy_since_send:
+                    self._busy_since_send = False
+                    self.ready_event.set()
 
-        # Notify state change
         if self.state_callback:
-            self._call_callback(self.state_callback, self.last_state)
+            self._emit_state()
+
+    def _emit_state(self):
+        """Notify the state callback, at most once per STATE_CALLBACK_INTERVAL.
+
+        A notification inside the interval is deferred to a timer at its
+        end; updates arriving before it, or before a pending delivery runs,
+        are delivered together.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._state_timer is not None:
+                return
+            wait = self._state_last_emit + self.STATE_CALLBACK_INTERVAL - now
+            if wait > 0:
+                self._state_timer = threading.Timer(wait, self._flush_state)
+                self._state_timer.daemon = True
+                self._state_timer.start()
+                return
+            self._state_last_emit = now
+
+        if self._callback_scheduler and threading.get_ident() != self._main_thread_id:
+            self._schedule_state()
+        else:
+            state = self._take_state()
+            if state is not None and self.state_callback:
+                self._call_callback(self.state_callback, state)
+
+    def _flush_state(self):
+        """Timer target: deliver the state notification held back by _emit_state."""
+        with self._lock:
+            self._state_timer = None
+        self._emit_state()
 
     def _merge_state(self, original, updates):
-        """Recursively merge update data into the original state."""
-        for key, value in updates.items():
-            if (key in original and isinstance(original[key], dict) and
-                    isinstance(value, dict)):
-                self._merge_state(original[key], value)
-            else:
-                original[key] = value
+        """Recursively merge update data into the original state.
+
+        Nested dicts are merged using an explicit stack rather than recursive
+        calls. State comes from JSON, so exact dict type checks suffice.
+        """
+        stack = [(original, updates)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in source.items():
+                existing = target.get(key)
+                if type(existing) is dict and type(value) is dict:
+                    stack.append((existing, value))
+                else:
+                    target[key] = value
 
 
     def get_state(self) -> Optional[Dict[str, Any]]:
         """Get current machine state via REST API."""
         try:
-            response = requests.get(f'{self.base_url}/api/state', timeout=5)
+            response = self.session.get(f'{self.base_url}/api/state', timeout=5)
             if response.status_code == 200:
-                state = response.json()
+                state = _loads(response.content)
                 self.last_state.update(state)
                 return state
         except Exception as e:
@@ -580,16 +598,67 @@ class BBCtrlCommunicator:
         # Process MSG/DEBUG commands locally before sending
         self.msg_debug_handler.process_command(command)
 
+        # Only a READY report after leaving READY acknowledges this command
+        with self._lock:
+            self._busy_since_send = False
+            self.ready_event.clear()
+
         try:
-            # Add newline terminator to the command as G-code typically requires line termination
-            command_with_terminator = command.rstrip() + '\n'
-            self.ws.send(command_with_terminator)
+            # Add newline terminator to the command as G-code typically requires
+            # line termination. Bytes are sent as-is in a text frame.
+            self.ws.send(command.encode('utf-8').rstrip() + b'\n')
             self._call_callback(self.message_callback, f"Sent: {command}")
             return True
         except Exception as e:
             self._call_callback(self.error_callback, f"Error sending command: {e}")
             return False
 
+    def send_gcode_batch(self, commands: List[str]) -> List[bool]:
+        """Send several G-code commands, packing consecutive lines into frames.
+
+        Lines are joined with newlines into frames of up to MAX_WRITE_BYTES
+        (a longer single line gets its own frame). Returns one success flag
+        per command; after a failed frame the remaining commands are not sent.
+        """
+        if not self.connected:
+            self._call_callback(self.error_callback, "Not connected to WebSocket")
+            return [False] * len(commands)
+
+        results: List[bool] = []
+        frame: List[bytes] = []
+        frame_bytes = 0
+
+        def flush() -> bool:
+            try:
+                self.ws.send(b''.join(frame))
+            except Exception as e:
+                self._call_callback(self.error_callback, f"Error sending command: {e}")
+                return False
+            # The frame holds the commands following those already reported
+            for command in commands[len(results):len(results) + len(frame)]:
+                self._call_callback(self.message_callback, f"Sent: {command.rstrip()}")
+            return True
+
+        for command in commands:
+            # Process MSG/DEBUG commands locally before sending
+            self.msg_debug_handler.process_command(command)
+            line = command.encode('utf-8').rstrip() + b'\n'
+            size = len(line)
+            if frame and frame_bytes + size > self.MAX_WRITE_BYTES:
+                ok = flush()
+                results.extend([ok] * len(frame))
+                frame, frame_bytes = [], 0
+                if not ok:
+                    break
+            frame.append(line)
+            frame_bytes += size
+        else:
+            if frame:
+                results.extend([flush()] * len(frame))
+
+        results.extend([False] * (len(commands) - len(results)))
+        return results
+
     def send_mdi_command(self, command: str) -> bool:
         """Send MDI command using the same simple method as send_gcode_direct.py."""
         # Use the exact same simple method that works in send_gcode_direct.py
@@ -600,9 +669,9 @@ class BBCtrlCommunicator:
         try:
             # Try WebSocket first for immediate response
             if self.connected:
-                self.ws.send('!')
+                self.ws.send(b'!')
             # Also try REST API for redundancy
-            response = requests.put(f'{self.base_url}/api/estop', timeout=2)
+            response = self.session.put(f'{self.base_url}/api/estop', timeout=2)
             self._call_callback(self.message_callback, "Emergency stop sent")
             return True
         except Exception as e:
@@ -612,7 +681,7 @@ class BBCtrlCommunicator:
     def clear_estop(self) -> bool:
         """Clear emergency stop condition."""
         try:
-            response = requests.put(f'{self.base_url}/api/clear', timeout=5)
+            response = self.session.put(f'{self.base_url}/api/clear', timeout=5)
             if response.status_code == 200:
                 self._call_callback(self.message_callback, "Emergency stop cleared")
                 return True
@@ -623,7 +692,7 @@ class BBCtrlCommunicator:
     def pause(self) -> bool:
         """Pause machine execution."""
         try:
-            response = requests.put(f'{self.base_url}/api/pause', timeout=5)
+            response = self.session.put(f'{self.base_url}/api/pause', timeout=5)
             return response.status_code == 200
         except Exception as e:
             self._call_callback(self.error_callback, f"Error pausing: {e}")
@@ -632,7 +701,7 @@ class BBCtrlCommunicator:
     def unpause(self) -> bool:
         """Resume machine execution."""
         try:
-            response = requests.put(f'{self.base_url}/api/unpause', timeout=5)
+            response = self.session.put(f'{self.base_url}/api/unpause', timeout=5)
             return response.status_code == 200
         except Exception as e:
             self._call_callback(self.error_callback, f"Error resuming: {e}")
@@ -641,7 +710,7 @@ class BBCtrlCommunicator:
     def stop(self) -> bool:
         """Stop machine execution."""
         try:
-            response = requests.put(f'{self.base_url}/api/stop', timeout=5)
+            response = self.session.put(f'{self.base_url}/api/stop', timeout=5)
             return response.status_code == 200
         except Exception as e:
             self._call_callback(self.error_callback, f"Error stopping: {e}")
@@ -662,14 +731,14 @@ class BBCtrlCommunicator:
         simple GET. Returns None on failure."""
         try:
             # Try dedicated endpoint first
-            resp = requests.get(f"{self.base_url}/api/time", timeout=5)
+            resp = self.session.get(f"{self.base_url}/api/time", timeout=5)
             if resp.status_code == 200:
                 return datetime.fromisoformat(resp.text.strip())
         except Exception:
             pass
         try:
             # Fallback: HEAD request to get Date header
-            resp = requests.head(self.base_url, timeout=5)
+            resp = self.session.head(self.base_url, timeout=5)
             if "Date" in resp.headers:
                 from email.utils import parsedate_to_datetime
                 return parsedate_to_datetime(resp.headers["Date"]).astimezone(tz=None)
@@ -680,11 +749,12 @@ class BBCtrlCommunicator:
     def upload_macro(self, name: str, macro_data: Dict[str, Any]) -> bool:
         """Upload or update a macro on the controller."""
         try:
-            resp = requests.put(
+            resp = self.session.put(
                 f"{self.base_url}/api/macros/{name}",
                 json=macro_data,
                 timeout=10,
             )
+            self._dir_cache.clear()
             return resp.status_code in (200, 201, 204)
         except Exception as e:
             self._call_callback(self.error_callback, f"Error uploading macro {name}: {e}")
@@ -693,122 +763,138 @@ class BBCtrlCommunicator:
     def delete_macro_on_controller(self, name: str) -> bool:
         """Delete a macro by name on the controller."""
         try:
-            resp = requests.delete(f"{self.base_url}/api/macros/{name}", timeout=10)
+            resp = self.session.delete(f"{self.base_url}/api/macros/{name}", timeout=10)
+            self._dir_cache.clear()
             return resp.status_code in (200, 204)
         except Exception as e:
             self._call_callback(self.error_callback, f"Error deleting macro {name}: {e}")
             return False
 
-    def _get_macro_description(self, path: str) -> str:
+    def _get_macro_description(self, path: str, modified: int = 0) -> str:
         """Extract description from macro file content.
 
+        Only the first DESCRIPTION_BYTES of the file are requested. When the
+        file's modification time is known, the result is cached until the
+        file changes.
+
         Args:
             path: Path to the macro file on the controller
+            modified: Modification time from the directory listing, or 0
 
         Returns:
             Extracted description or empty string if not found
         """
+        key = (path, modified)
+        if modified and key in self._desc_cache:
+            return self._desc_cache[key]
+
+        description = ""
         try:
-            # Get the file content
+            # Get the start of the file content
             url = f"{self.base_url}/api/fs/{requests.utils.quote(path, safe='/')}"
-            response = requests.get(url, timeout=10)
-
-            if response.status_code == 200:
-                content = response.text
-                # Look for description in the first few lines (common patterns)
-                for line in content.split('\n')[:10]:
-                    line = line.strip()
-                    # Look for common comment patterns
-                    if line.startswith(';'):
-                        # Remove comment character and clean up
-                        desc = line[1:].strip()
-                        # Remove any trailing comments or special characters
-                        desc = desc.split(';')[0].strip()
-                        if desc:  # Return first non-empty comment line as description
-                            return desc
-                    elif ';' in line:  # Inline comment
-                        desc = line.split(';', 1)[1].strip()
-                        if desc:
-                            return desc
+            headers = {'Range': f'bytes=0-{self.DESCRIPTION_BYTES - 1}'}
+            with self.session.get(url, headers=headers, stream=True, timeout=10) as response:
+                if response.status_code not in (200, 206):
+                    return ""
+                head = next(response.iter_content(self.DESCRIPTION_BYTES), b'')
+            description = self._parse_description(head.decode('utf-8', 'replace'))
         except Exception as e:
-            print(f"WARNING: Could not get description for {path}: {str(e)}")
+            logger.warning("Could not get description for %s: %s", path, e)
+            return ""
+
+        if modified:
+            self._desc_cache[key] = description
+        return description
+
+    @staticmethod
+    def _parse_description(content: str) -> str:
+        """Return the first comment in the first lines of G-code, or ""."""
+        # Look for description in the first few lines (common patterns)
+        for line in content.split('\n', 10)[:10]:
+            line = line.strip()
+            # Look for common comment patterns
+            if line.startswith(';'):
+                # Remove comment character and clean up
+                desc = line[1:].strip()
+                # Remove any trailing comments or special characters
+                desc = desc.split(';')[0].strip()
+                if desc:  # Return first non-empty comment line as description
+                    return desc
+            elif ';' in line:  # Inline comment
+                desc = line.split(';', 1)[1].strip()
+                if desc:
+                    return desc
 
         return ""  # Return empty string if no description found
 
     def _list_directory(self, path: str) -> List[Dict[str, Any]]:
         """List contents of a directory on the controller.
 
+        Successful listings are reused for DIR_CACHE_TTL seconds; writes
+        through this communicator discard them.
+
         Args:
             path: The directory path to list, relative to the controller's root
 
         Returns:
             List of file/directory entries, or empty list on error
         """
-        print(f"\n{'='*80}")
-        print(f"DEBUG: _list_directory('{path}')")
-        print(f"Thread: {threading.current_thread().name}")
-        print(f"Base URL: {self.base_url}")
-        print(f"Connected: {self.connected}")
+        cached = self._dir_cache.get(path)
+        if cached is not None and time.monotonic() - cached[0] < self.DIR_CACHE_TTL:
+            return cached[1]
+
+        logger.debug("_list_directory(%r) from thread %s (base URL: %s, connected: %s)",
+                     path, threading.current_thread().name, self.base_url, self.connected)
 
         try:
             # Ensure path is properly URL-encoded
             encoded_path = requests.utils.quote(path)
             url = f'{self.base_url}/api/fs/{encoded_path}'
-            print(f"DEBUG: Requesting URL: {url}")
 
-            # Print request headers for debugging
-            headers = {}
-            print(f"DEBUG: Sending GET request to {url}")
-
-            start_time = time.time()
-            response = self.session.get(url, headers=headers, timeout=10)
-            elapsed = time.time() - start_time
+            start_time = time.monotonic()
+            response = self.session.get(url, timeout=10)
+            elapsed = time.monotonic() - start_time
 
-            print(f"DEBUG: Response received in {elapsed:.2f} seconds")
-            print(f"DEBUG: Status code: {response.status_code}")
-            print(f"DEBUG: Response headers: {dict(response.headers)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("GET %s: %s in %.2f seconds, headers: %s",
+                             url, response.status_code, elapsed, dict(response.headers))
 
             if response.status_code == 200:
                 try:
-                    data = response.json()
+                    data = _loads(response.content)
                     files = data.get('files', [])
-                    print(f"DEBUG: Found {len(files)} items in {path}")
-
-                    # Log first few items for debugging
-                    for i, item in enumerate(files[:5]):
-                        print(f"  {i+1}. {item.get('name', 'unnamed')} (dir: {item.get('dir', False)})")
-                    if len(files) > 5:
-                        print(f"  ... and {len(files) - 5} more items")
-
+                    logger.debug("Found %d items in %s", len(files), path)
+                    self._dir_cache[path] = (time.monotonic(), files)
                     return files
                 except Exception as json_error:
-                    print(f"ERROR parsing JSON response: {str(json_error)}")
-                    print(f"Response content: {response.text[:500]}...")
+                    logger.error("Error parsing directory listing of %s: %s; response content: %.500s",
+                                 path, json_error, response.text)
                     return []
 
             elif response.status_code == 404:
-                print(f"DEBUG: Directory not found: {path}")
-                print(f"Response content: {response.text}")
+                logger.debug("Directory not found: %s", path)
                 return []
             else:
-                print(f"DEBUG: Unexpected status code {response.status_code}")
-                print(f"Response content: {response.text}")
-                print(f"WARNING: Failed to list directory {path}: {response.status_code}")
+                logger.warning("Failed to list directory %s: %s %.500s",
+                               path, response.status_code, response.text)
                 return []
 
         except requests.exceptions.RequestException as e:
-            print(f"ERROR: Network error listing directory {path}: {str(e)}")
+            logger.error("Network error listing directory %s: %s", path, e)
             return []
 
-        except Exception as e:
-            print(f"ERROR: Unexpected error listing directory {path}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Unexpected error listing directory %s", path)
             return []
 
     def _find_macros_recursive(self, path: str) -> Dict[str, Dict[str, Any]]:
         """Recursively find all .gcode files in the given directory.
 
+        The tree is walked breadth first: the directories of each level are
+        listed concurrently, then the descriptions of all macros found are
+        fetched concurrently. When two files share a macro name, the more
+        recently modified one wins.
+
         Args:
             path: The directory path to search, relative to the controller's root
 
@@ -817,72 +903,88 @@ class BBCtrlCommunicator:
         """
         macros = {}
 
+        # Skip hidden directories (like .Trash); hidden subdirectories are
+        # never queued by _collect_macros
+        if '/.' in path or path.startswith('.'):
+            logger.debug("Skipping hidden directory: %s", path)
+            return macros
+
         try:
-            # Skip hidden directories (like .Trash)
-            if '/.' in path or path.startswith('.'):
-                print(f"DEBUG: Skipping hidden directory: {path}")
-                return macros
+            with ThreadPoolExecutor(max_workers=self.MACRO_SCAN_WORKERS) as pool:
+                level = [path]
+                while level:
+                    subdirs = []
+                    for dir_path, items in zip(level, pool.map(self._list_directory, level)):
+                        logger.debug("Searching directory: %s", dir_path)
+                        self._collect_macros(dir_path, items, macros, subdirs)
+                    level = subdirs
+
+                entries = list(macros.values())
+                descriptions = pool.map(
+                    lambda entry: self._get_macro_description(entry['path'], entry['modified']), entries)
+                for entry, description in zip(entries, descriptions):
+                    entry['description'] = description
 
-            print(f"DEBUG: Searching directory: {path}")
-            items = self._list_directory(path)
+        except Exception:
+            logger.exception("Error searching %s", path)
 
-            # Determine category from path (last directory name)
-            category = 'uncategorized'
-            if '/' in path:
-                # Use the last directory as the category
-                category = path.split('/')[-1].lower()
-                # Clean up the category name
-                category = category.replace('_', ' ').title()
+        return macros
 
-            for item in items:
-                try:
-                    item_name = item.get('name', '')
-                    if not item_name:
-                        continue
+    def _collect_macros(self, path: str, items: List[Dict[str, Any]],
+                        macros: Dict[str, Dict[str, Any]], subdirs: List[str]):
+        """Add the macro files of one directory listing to ``macros``.
 
-                    # Skip hidden files/directories
-                    if item_name.startswith('.'):
-                        continue
+        Visible subdirectories are appended to ``subdirs``. Descriptions are
+        left empty for the caller to fill in.
+        """
+        # Determine category from path (last directory name)
+        category = 'uncategorized'
+        if '/' in path:
+            # Use the last directory as the category
+            category = path.split('/')[-1].lower()
+            # Clean up the category name
+            category = category.replace('_', ' ').title()
+
+        for item in items:
+            try:
+                item_name = item.get('name', '')
+                if not item_name:
+                    continue
 
-                    if item.get('dir', False):
-                        # Recursively search subdirectories
-                        subdir_path = f"{path}/{item_name}" if path else item_name
-                        macros.update(self._find_macros_recursive(subdir_path))
-
-                    elif item_name.lower().endswith(('.gcode', '.nc', '.tap', '.ngc')):
-                        # Add macro to results
-                        macro_name, _ = os.path.splitext(item_name)
-                        full_path = f"{path}/{item_name}" if path else item_name
-
-                        # Try to get description from file content
-                        description = self._get_macro_description(full_path)
-
-                        # Skip if we already found this macro with the same or newer timestamp
-                        existing_macro = macros.get(macro_name)
-                        if existing_macro and 'modified' in item and 'modified' in existing_macro:
-                            if item['modified'] <= existing_macro['modified']:
-                                continue
-
-                        macros[macro_name] = {
-                            'name': macro_name,
-                            'category': category,
-                            'description': description,
-                            'modified': item.get('modified', 0),
-                            'size': item.get('size', 0),
-                            'path': full_path
-                        }
-                        print(f"DEBUG: Found macro: {macro_name} at {full_path} (Category: {category})")
-
-                except Exception as item_error:
-                    print(f"WARNING: Error processing item {item.get('name', 'unnamed')} in {path}: {str(item_error)}")
+                # Skip hidden files/directories
+                if item_name.startswith('.'):
                     continue
 
-        except Exception as e:
-            print(f"WARNING: Error searching {path}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+                if item.get('dir', False):
+                    subdirs.append(f"{path}/{item_name}" if path else item_name)
+                    continue
 
-        return macros
+                macro_name, ext = os.path.splitext(item_name)
+                if ext.lower() not in _MACRO_EXTS:
+                    continue
+
+                # Add macro to results
+                full_path = f"{path}/{item_name}" if path else item_name
+
+                # Skip if we already found this macro with the same or newer timestamp
+                existing_macro = macros.get(macro_name)
+                if existing_macro and 'modified' in item and 'modified' in existing_macro:
+                    if item['modified'] <= existing_macro['modified']:
+                        continue
+
+                macros[macro_name] = {
+                    'name': macro_name,
+                    'category': category,
+                    'description': '',
+                    'modified': item.get('modified', 0),
+                    'size': item.get('size', 0),
+                    'path': full_path
+                }
+                logger.debug("Found macro: %s at %s (Category: %s)", macro_name, full_path, category)
+
+            except Exception as item_error:
+                logger.warning("Error processing item %s in %s: %s", item.get('name', 'unnamed'), path, item_error)
+                continue
 
     def list_directory(self, path: str) -> List[Dict[str, Any]]:
         """List contents of a directory on the controller.
@@ -898,18 +1000,13 @@ class BBCtrlCommunicator:
             - modified: Last modified timestamp (for files)
             - path: Full path of the item
         """
-        print(f"\n{'='*80}")
-        print(f"DEBUG: list_directory('{path}')")
-        print(f"Thread: {threading.current_thread().name}")
-        print(f"Connected: {self.connected}")
-        print(f"WebSocket: {self.ws is not None}")
+        logger.debug("list_directory(%r) from thread %s (connected: %s, websocket: %s)",
+                     path, threading.current_thread().name, self.connected, self.ws is not None)
 
         try:
             # Handle root directory
             if path in ['', '/']:
-                print("DEBUG: Requesting root directory contents...")
                 items = self._list_directory('')
-                print(f"DEBUG: Got {len(items)} items from _list_directory('')")
 
                 # Process items and add to result in a single pass
                 result = []
@@ -922,7 +1019,6 @@ class BBCtrlCommunicator:
                         continue
 
                     is_dir = item.get('dir', False)
-                    print(f"  - {name} (dir: {is_dir}, size: {item.get('size', 0)})")
 
                     result.append({
                         'name': name,
@@ -933,8 +1029,7 @@ class BBCtrlCommunicator:
                         'path': name
                     })
 
-                print(f"DEBUG: Filtered out {hidden_count} hidden items, returning {len(result)} items")
-                print(f"First few items: {result[:3]}" if result else "No items to return")
+                logger.debug("Filtered out %d hidden items, returning %d items", hidden_count, len(result))
 
                 return result
 
@@ -968,68 +1063,139 @@ class BBCtrlCommunicator:
 
             return result
 
-        except Exception as e:
-            print(f"ERROR: Failed to list directory {path}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Failed to list directory %s", path)
             return []
 
-    def read_file(self, file_path: str) -> Optional[str]:
+    def read_file(self, file_path: str, max_bytes: Optional[int] = None) -> Optional[str]:
         """Read the contents of a file from the controller.
 
+        The body is streamed and decoded as UTF-8, so no charset detection is
+        run. With ``max_bytes`` set, no more than that is ever held in memory;
+        the macro sync passes MAX_READ_BYTES, while G-code programs opened
+        for debugging are read whatever their size.
+
         Args:
             file_path: Path to the file to read (relative to controller root)
+            max_bytes: Largest file to read, or None for no limit
 
         Returns:
             File contents as string, or None if the file could not be read
+            or is larger than ``max_bytes``
         """
         try:
             from urllib.parse import quote
             encoded_path = quote(file_path, safe='/')
             url = f'{self.base_url}/api/fs/{encoded_path}'
-            print(f"DEBUG: Reading file: {url}")
+            logger.debug("Reading file: %s", url)
+
+            with self.session.get(url, stream=True, timeout=10) as response:
+                if response.status_code == 200:
+                    content = bytearray()
+                    for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                        content += chunk
+                        if max_bytes is not None and len(content) > max_bytes:
+                            logger.error("File %s is larger than %d bytes, not reading it",
+                                         file_path, max_bytes)
+                            return None
+                    return content.decode('utf-8', 'replace')
+
+                elif response.status_code == 404:
+                    logger.error("File not found: %s", file_path)
+                    return None
 
-            response = self.session.get(url, timeout=10)
+                else:
+                    response.encoding = 'utf-8'
+                    logger.error("Failed to read file %s: HTTP %s %.500s",
+                                 file_path, response.status_code, response.text)
+                    return None
 
-            if response.status_code == 200:
-                return response.text
+        except requests.exceptions.RequestException as e:
+            logger.error("Network error reading file %s: %s", file_path, e)
+            return None
 
-            elif response.status_code == 404:
-                print(f"ERROR: File not found: {file_path}")
-                return None
+        except Exception:
+            logger.exception("Unexpected error reading file %s", file_path)
+            return None
 
-            else:
-                error_msg = f"Failed to read file {file_path}: HTTP {response.status_code}"
-                print(f"ERROR: {error_msg}")
-                if response.text:
-                    print(f"Response body: {response.text[:500]}")
-                return None
+    def read_file_stream(self, file_path: str,
+                         chunk_size: int = STREAM_CHUNK_SIZE) -> Optional[Iterator[bytes]]:
+        """Read a file from the controller as an iterator of byte chunks.
 
-        except requests.exceptions.RequestException as e:
-            print(f"ERROR: Network error reading file {file_path}: {str(e)}")
-            return None
+        Args:
+            file_path: Path to the file to read (relative to controller root)
+            chunk_size: Maximum size of each chunk
 
-        except Exception as e:
-            print(f"ERROR: Unexpected error reading file {file_path}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        Returns:
+            Iterator over the raw file contents, or None if the file could
+            not be read. The response is released once iteration finishes.
+        """
+        from urllib.parse import quote
+        url = f'{self.base_url}/api/fs/{quote(file_path, safe="/")}'
+        try:
+            response = self.session.get(url, stream=True, timeout=10)
+        except requests.exceptions.RequestException:
             return None
+        if response.status_code != 200:
+            response.close()
+            return None
+
+        def chunks():
+            with response:
+                yield from response.iter_content(chunk_size)
+        return chunks()
+
+    def write_file_stream(self, file_path: str, chunks: Iterable[bytes]) -> tuple[bool, str]:
+        """Write a file on the controller from an iterable of byte chunks.
+
+        The body is sent with chunked transfer encoding, so the content is
+        never held in memory as a whole. Unlike :meth:`write_file` there is no
+        retry after re-authentication, since the chunks are consumed.
+        """
+        if not self.connected:
+            return False, "Not connected, cannot write file."
+        if not self.session.cookies:
+            return False, "No authentication cookies found. Login may be required for file writes."
+
+        from urllib.parse import quote
+        file_path = file_path.lstrip('/')
+        if not file_path.strip():
+            return False, "File path cannot be empty"
+        url = f"{self.base_url}/api/fs/{quote(file_path, safe='/')}"
+        api_headers = {
+            'Content-Type': 'text/plain',
+            'Accept': 'application/json',
+            'User-Agent': 'GCodeDebugger/1.0',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+        try:
+            response = self.session.put(url, data=chunks, headers=api_headers, timeout=10)
+            if 'text/html' in response.headers.get('content-type', ''):
+                return False, "Authentication required for file writes"
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            error_message = f"Error writing to {file_path}: {e}"
+            self._call_callback(self.error_callback, error_message)
+            return False, error_message
+        self._dir_cache.clear()
+        return True, f"Successfully wrote to {file_path}"
 
     def close(self):
         """Close the WebSocket connection and clean up resources."""
-        print("[DEBUG] Close called")
+        logger.debug("Close called")
         self._stopping = True
-        self._stop_keepalive()
-
-        if hasattr(self, '_reconnect_timer') and self._reconnect_timer:
-            self._reconnect_timer.cancel()
+        self._stop_event.set()
+        with self._lock:
+            if self._state_timer is not None:
+                self._state_timer.cancel()
+                self._state_timer = None
 
-        ws_to_close = getattr(self, 'ws', None)
-        if ws_to_close:
+        ws_to_close = self.ws
+        if ws_to_close is not None:
             try:
                 ws_to_close.close()
             except Exception as e:
-                print(f"[WARNING] Error closing WebSocket: {e}")
+                logger.warning("Error closing WebSocket: %s", e)
 
         if self.ws_thread and self.ws_thread.is_alive():
             self.ws_thread.join(timeout=5.0)
@@ -1037,6 +1203,7 @@ class BBCtrlCommunicator:
         self.connected = False
         self.ws = None
         self.ws_thread = None
+        self.session.close()
 
     def write_file(self, file_path: str, content: str) -> tuple[bool, str]:
         """Write content to a file on the controller, returning success and a message."""
@@ -1135,6 +1302,7 @@ class BBCtrlCommunicator:
 
             response.raise_for_status()  # Raise an exception for bad status codes
 
+            self._dir_cache.clear()
             success_msg = f"Successfully wrote to {file_path}"
             print(f"[INFO] {success_msg}")
             return True, success_msg
@@ -8,6 +8,7 @@ Local macros are executed by sending individual commands through the debugger.
 
 import json
 import os
+import time
 from typing import List, Dict, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime
@@ -318,7 +319,6 @@ class LocalMacroExecutor:
                 
                 # Small delay between commands
                 if i < len(local_macro.commands) - 1:
-                    import time
                     time.sleep(delay)
             
             self.executing = False
@@ -6,13 +6,58 @@ Handles creation, storage, and execution of G-code macros.
 """
 
 import os
+import sys
 import json
-from typing import List, Dict, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple, Callable, NamedTuple
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone, timedelta
 from .config import get_config
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON encoding/decoding
+    orjson = None
+
+# Default for unset executor callbacks, so call sites need no None checks
+_NOOP = lambda *args, **kwargs: None
+
+def _dump_json(data: Dict[str, Any]) -> bytes:
+    """Serialize macro metadata to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _dump_json_line(data: Dict[str, Any]) -> bytes:
+    """Serialize a record as one compact, newline-terminated JSON line."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8') + b"\n"
+
+def _load_json(raw: bytes) -> Any:
+    """Parse JSON from bytes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _iter_json_files(directory: str):
+    """Yield scandir entries for the regular ``.json`` files in ``directory``.
+
+    ``is_file(follow_symlinks=False)`` answers from the directory listing,
+    so no per-entry stat is needed.
+    """
+    with os.scandir(directory) as entries:
+        yield from (entry for entry in entries
+                    if entry.name.endswith('.json') and entry.is_file(follow_symlinks=False))
+
+# Slotted instances have no per-instance __dict__ (Python 3.10+)
+@dataclass(**({'slots': True} if sys.version_info >= (3, 10) else {}))
 class Macro:
     """Represents a G-code macro."""
     name: str
@@ -23,17 +68,53 @@ class Macro:
     category: str = "user"
     color: str = "#e6e6e6"
     hotkey: str = ""
+    # Optional grouping of ``commands`` into runs of independent commands
+    # (e.g. M114/M105 queries) that may be sent concurrently, as the length
+    # of each consecutive run. Ignored unless the lengths cover ``commands``.
+    groups: Optional[List[int]] = None
 
     # --- Legacy adapter -------------------------------------------------
     # Treat the dataclass like a mapping so legacy tests that do
     # `macro["commands"]` or similar continue to work.
     def __getitem__(self, key):
-        return getattr(self, key)
+        # Only dataclass fields are keys; unknown keys raise KeyError
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return _getattribute(self, key)
+
+_FIELDS = tuple(f.name for f in fields(Macro))
+_FIELD_SET = frozenset(_FIELDS)
+_getattribute = object.__getattribute__
+
+def _groups_cover(groups: Optional[List[int]], total: int) -> bool:
+    """Check that group lengths split exactly ``total`` commands.
+
+    Metadata written before groups were stored as lengths holds lists of
+    commands instead; those never match.
+    """
+    return bool(groups) and all(type(size) is int and size > 0 for size in groups) \
+        and sum(groups) == total
+
+def _macro_dict(macro: Macro) -> Dict[str, Any]:
+    """Return the macro's fields as a dict (slotted macros have no vars())."""
+    return {name: getattr(macro, name) for name in _FIELDS}
+
+class ControllerMacro(NamedTuple):
+    """A macro file found on the controller."""
+    name: str
+    path: str
+    description: str = ""
+    category: str = "user"
 
 class MacroManager:
     """Manages G-code macros for the debugger.
     Metadata (.json) is stored under macros/.meta while raw macro files mirror the controller's folder structure under macros/.
     """
+
+    # Threads used to read per-macro metadata files when there is no index
+    LOAD_WORKERS = 8
+    # Superseded index records tolerated before the index is rewritten
+    INDEX_COMPACT_STALE = 256
     
     def __init__(self, *args, **kwargs):
         """
@@ -67,39 +148,59 @@ class MacroManager:
         # Preserve unknown kwargs for future compatibility but ignore for now
         self.macros_directory = os.path.abspath(os.path.expanduser(str(macros_dir)))
         self.meta_directory = os.path.join(self.macros_directory, ".meta")
+        # All metadata in one newline-delimited file. The per-macro JSON
+        # files are the legacy format: they are only read when there is no
+        # index (and then migrated into one) or the index cannot be opened.
+        self._index_path = os.path.join(self.meta_directory, "macros.jsonl")
+        # Records in the index, live or superseded
+        self._index_records = 0
+        # False once an existing index could not be opened; it is then never
+        # written, so macros loaded from elsewhere cannot replace it
+        self._index_writable = True
+        self._config = get_config()
         self.macros: Dict[str, Macro] = {}
+        # category -> macro names; a dict keeps names in insertion order
+        self._by_cat: Dict[str, Dict[str, None]] = {}
         self.categories = ["system", "user", "homing", "tool_change", "probing", "custom"]
 
-        print(f"DEBUG: Initializing MacroManager with directory: {self.macros_directory} "
-              f"(communicator={'set' if self.communicator else 'none'}), meta={self.meta_directory}")
+        logger.debug("Initializing MacroManager with directory: %s (communicator=%s), meta=%s",
+                     self.macros_directory, 'set' if self.communicator else 'none',
+                     self.meta_directory)
 
         try:
             # Ensure macros directory exists and is writable ------------------------
             os.makedirs(self.macros_directory, exist_ok=True)
             os.makedirs(self.meta_directory, exist_ok=True)
             if not os.access(self.macros_directory, os.W_OK):
-                print(f"WARNING: Directory is not writable: {self.macros_directory}")
+                logger.warning("Directory is not writable: %s", self.macros_directory)
 
             # Load any existing macros ---------------------------------------------
             self.load_macros()
 
             # If none exist, create the defaults -----------------------------------
             if not self.macros:
-                print("DEBUG: No macros found, creating default macros")
+                logger.debug("No macros found, creating default macros")
                 self._create_default_macros()
 
         except Exception as e:
-            print(f"ERROR: Failed to initialize MacroManager: {str(e)}")
+            logger.error("Failed to initialize MacroManager: %s", e)
             # Continue with an empty macro list rather than crashing
             self.macros = {}
+            self._by_cat = {}
     
     def create_macro(self, name: str, commands: List[str], description: str = "", 
-                    category: str = "user", color: str = "#e6e6e6", hotkey: str = "") -> bool:
-        """Create a new macro."""
+                    category: str = "user", color: str = "#e6e6e6", hotkey: str = "",
+                    _persist: bool = True, _timestamp: Optional[str] = None) -> bool:
+        """Create a new macro.
+
+        ``_persist=False`` only adds the macro in memory; internal batch
+        operations use it and write the files once afterwards. They also pass
+        one ``_timestamp`` for the whole batch.
+        """
         if name in self.macros:
             return False  # Macro already exists
         
-        current_time = datetime.now().isoformat()
+        current_time = _timestamp or datetime.now().isoformat()
         
         macro = Macro(
             name=name,
@@ -113,12 +214,18 @@ class MacroManager:
         )
         
         self.macros[name] = macro
-        self.save_macro(name)
+        self._by_cat.setdefault(category, {})[name] = None
+        if _persist:
+            self.save_macro(name)
         return True
     
     def update_macro(self, name: str, commands: List[str] = None, description: str = None,
-                    category: str = None, color: str = None, hotkey: str = None) -> bool:
-        """Update an existing macro."""
+                    category: str = None, color: str = None, hotkey: str = None,
+                    _persist: bool = True, _timestamp: Optional[str] = None) -> bool:
+        """Update an existing macro.
+
+        ``_persist`` and ``_timestamp`` behave as for :meth:`create_macro`.
+        """
         if name not in self.macros:
             return False
         
@@ -126,17 +233,22 @@ class MacroManager:
         
         if commands is not None:
             macro.commands = commands
+            # Group lengths described the old commands
+            macro.groups = None
         if description is not None:
             macro.description = description
-        if category is not None:
+        if category is not None and category != macro.category:
+            self._by_cat.get(macro.category, {}).pop(name, None)
+            self._by_cat.setdefault(category, {})[name] = None
             macro.category = category
         if color is not None:
             macro.color = color
         if hotkey is not None:
             macro.hotkey = hotkey
         
-        macro.modified_date = datetime.now().isoformat()
-        self.save_macro(name)
+        macro.modified_date = _timestamp or datetime.now().isoformat()
+        if _persist:
+            self.save_macro(name)
         return True
     
     def delete_macro(self, name: str) -> bool:
@@ -145,12 +257,15 @@ class MacroManager:
             return False
         
         # Remove from memory
-        del self.macros[name]
+        macro = self.macros.pop(name)
+        self._by_cat.get(macro.category, {}).pop(name, None)
         
-        # Remove file
-        filepath = os.path.join(self.macros_directory, f"{name}.json")
+        # Remove the metadata file save_macro wrote, so the per-file
+        # fallback cannot bring the macro back
+        filepath = os.path.join(self.meta_directory, f"{name}.json")
         if os.path.exists(filepath):
             os.remove(filepath)
+        self._append_index({"name": name, "_deleted": True})
         
         return True
     
@@ -160,7 +275,7 @@ class MacroManager:
     
     def get_macros_by_category(self, category: str) -> List[Macro]:
         """Get all macros in a specific category."""
-        return [macro for macro in self.macros.values() if macro.category == category]
+        return [self.macros[name] for name in self._by_cat.get(category, ())]
     
     def get_all_macros(self) -> List[Macro]:
         """Get all macros."""
@@ -173,50 +288,174 @@ class MacroManager:
 
         try:
             filepath = os.path.join(self.meta_directory, f"{name}.json")
-            with open(filepath, 'w') as f:
-                json.dump(asdict(self.macros[name]), f, indent=2)
-            return True
+            data = _dump_json(_macro_dict(self.macros[name]))
+            # A single unbuffered write; the payload is already encoded.
+            fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
         except Exception:
             return False
+        self._append_index(_macro_dict(self.macros[name]))
+        return True
+
+    def _append_index(self, record: Dict[str, Any]) -> None:
+        """Append a record to the index, if there is one, so it stays current.
+
+        Later lines override earlier ones. Once INDEX_COMPACT_STALE records
+        are superseded, or if the append fails, the whole index is rewritten
+        instead.
+        """
+        if not self._index_writable or not os.path.exists(self._index_path):
+            return
+        try:
+            if self._index_records - len(self.macros) < self.INDEX_COMPACT_STALE:
+                fd = os.open(self._index_path, os.O_WRONLY | os.O_APPEND)
+                try:
+                    os.write(fd, _dump_json_line(record))
+                finally:
+                    os.close(fd)
+                self._index_records += 1
+                return
+        except OSError as e:
+            logger.warning("Failed to append to macro index %s, rewriting it: %s",
+                           self._index_path, e)
+        self.save_all_macros()
+
+    def _write_index(self) -> None:
+        """Write every macro to the index in one go, replacing it atomically."""
+        data = b"".join(_dump_json_line(_macro_dict(macro)) for macro in self.macros.values())
+        tmp_path = self._index_path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self._index_path)
+        self._index_records = len(self.macros)
+
+    def _load_index(self) -> bool:
+        """Load all macros from the index. Returns False if it cannot be read.
+
+        Lines that cannot be decoded (e.g. an append torn by a crash) are
+        skipped, and the index is then rewritten without them.
+        """
+        loaded: Dict[str, Optional[Macro]] = {}
+        records = 0
+        skipped = 0
+        try:
+            with open(self._index_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    records += 1
+                    try:
+                        data = _load_json(line)
+                        # A deletion record leaves None so the name is dropped
+                        loaded[data["name"]] = None if data.get("_deleted") else Macro(**data)
+                    except (ValueError, TypeError, KeyError):
+                        skipped += 1
+        except OSError as e:
+            logger.error("Cannot read macro index %s: %s", self._index_path, e)
+            return False
+        self._index_records = records
+        for name, macro in loaded.items():
+            if macro is None:
+                old = self.macros.pop(name, None)
+                if old is not None:
+                    self._by_cat.get(old.category, {}).pop(name, None)
+            else:
+                self._add_loaded(macro, name)
+        if skipped:
+            logger.warning("Skipped %d undecodable records in macro index %s",
+                           skipped, self._index_path)
+            # Rewrite it now, so later appends do not land on a torn line
+            self.save_all_macros()
+        return True
     
     def load_macro(self, name: str) -> bool:
         """Load a macro from file."""
+        filepath = os.path.join(self.meta_directory, f"{name}.json")
+        if not os.path.exists(filepath):
+            return False
+        return self._load_macro_path(filepath, name)
+    
+    def _load_macro_path(self, filepath: str, name: str) -> bool:
+        """Load a macro from a metadata file already known to exist."""
+        macro = self._read_macro_file(filepath)
+        if macro is None:
+            return False
+        self._add_loaded(macro, name)
+        return True
+
+    @staticmethod
+    def _read_macro_file(filepath: str) -> Optional[Macro]:
+        """Read one metadata file, returning None if it cannot be loaded."""
         try:
-            filepath = os.path.join(self.meta_directory, f"{name}.json")
-            if not os.path.exists(filepath):
-                return False
-            
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            
-            macro = Macro(**data)
-            self.macros[name] = macro
-            return True
+            with open(filepath, 'rb') as f:
+                data = _load_json(f.read())
+            return Macro(**data)
         except Exception:
-            return False
+            return None
+
+    def _add_loaded(self, macro: Macro, name: Optional[str] = None) -> None:
+        """Add or replace a macro read from storage, keeping the category index."""
+        name = name or macro.name
+        old = self.macros.get(name)
+        if old is not None:
+            self._by_cat.get(old.category, {}).pop(name, None)
+        self.macros[name] = macro
+        self._by_cat.setdefault(macro.category, {})[name] = None
     
     def load_macros(self):
         """Load all macros from the macros directory."""
-        print(f"DEBUG: Loading macros (metadata) from: {os.path.abspath(self.meta_directory)}")
+        logger.debug("Loading macros (metadata) from: %s", self.meta_directory)
         if not os.path.exists(self.meta_directory):
-            print(f"ERROR: Meta directory does not exist: {os.path.abspath(self.meta_directory)}")
+            logger.error("Meta directory does not exist: %s", self.meta_directory)
             return
+
+        index_exists = os.path.exists(self._index_path)
+        if index_exists:
+            if self._load_index():
+                logger.debug("Loaded %d macros from index", len(self.macros))
+                if self._index_records - len(self.macros) >= self.INDEX_COMPACT_STALE:
+                    self.save_all_macros()
+                return
+            # Show what the legacy files hold, but leave the index alone
+            self._index_writable = False
+            logger.warning("Loading per-macro files; the macro index will not be updated")
         
-        file_count = 0
-        for filename in os.listdir(self.meta_directory):
-            if filename.endswith('.json'):
-                file_count += 1
-                name = filename[:-5]  # Remove .json extension
-                print(f"DEBUG: Loading macro from file: {filename}")
-                if not self.load_macro(name):
-                    print(f"WARNING: Failed to load macro from file: {filename}")
+        entries = list(_iter_json_files(self.meta_directory))
+        # The reads are I/O bound and release the GIL; results are merged
+        # into self.macros on this thread, in directory order.
+        with ThreadPoolExecutor(max_workers=self.LOAD_WORKERS) as pool:
+            results = pool.map(self._read_macro_file, [entry.path for entry in entries])
+            for entry, macro in zip(entries, results):
+                filename = entry.name
+                if macro is None:
+                    logger.warning("Failed to load macro from file: %s", filename)
+                else:
+                    self._add_loaded(macro, filename[:-5])  # Remove .json extension
         
-        print(f"DEBUG: Loaded {len(self.macros)} macros from {file_count} files")
+        logger.debug("Loaded %d macros from %d files", len(self.macros), len(entries))
+        if not index_exists and self.macros:
+            # Migrate the legacy files into an index
+            self.save_all_macros()
     
     def save_all_macros(self):
-        """Save all macros to files."""
-        for name in self.macros:
-            self.save_macro(name)
+        """Save all macros to the index file in a single write."""
+        if not self._index_writable:
+            logger.error("Not saving macros: the macro index %s could not be read",
+                         self._index_path)
+            return False
+        try:
+            self._write_index()
+            return True
+        except OSError as e:
+            logger.error("Failed to write macro index %s: %s", self._index_path, e)
+            return False
 
     def sync_from_controller(self, communicator) -> bool:
         """Sync macros from the controller to the local directory, mirroring the folder structure.
@@ -227,28 +466,31 @@ class MacroManager:
         Returns:
             bool: True if sync was successful, False otherwise
         """
-        print("DEBUG: Starting sync_from_controller with structure mirroring")
+        logger.debug("Starting sync_from_controller with structure mirroring")
         try:
             # Ensure directory exists and is writable
-            print(f"DEBUG: Ensuring directory exists: {self.macros_directory}")
+            logger.debug("Ensuring directory exists: %s", self.macros_directory)
             os.makedirs(self.macros_directory, exist_ok=True)
             if not os.access(self.macros_directory, os.W_OK):
-                error_msg = f"ERROR: Directory is not writable: {self.macros_directory}"
-                print(error_msg)
+                logger.error("Directory is not writable: %s", self.macros_directory)
                 return False
             
             # Get macros from controller using file system methods
-            print("DEBUG: Fetching macros from controller...")
+            logger.debug("Fetching macros from controller...")
             controller_macros = self._discover_controller_macros(communicator)
             
             if not controller_macros:
-                print("WARNING: No macros found on controller")
+                logger.warning("No macros found on controller")
                 return False
                 
-            print(f"DEBUG: Found {len(controller_macros)} macros on controller")
+            logger.debug("Found %d macros on controller", len(controller_macros))
             
             synced_count = 0
             failed_count = 0
+            # Metadata changes are kept in memory during the pass and written
+            # to the index once at the end.
+            changed = set()
+            current_time = datetime.now().isoformat()
             
             # Process each macro
             for macro in controller_macros:
@@ -256,7 +498,7 @@ class MacroManager:
                     # Get the relative path from the macro
                     path_on_controller = macro.path
                     if not path_on_controller:
-                        print(f"WARNING: Skipping macro {macro.name} - no path")
+                        logger.warning("Skipping macro %s - no path", macro.name)
                         failed_count += 1
                         continue
                     
@@ -274,9 +516,10 @@ class MacroManager:
                     os.makedirs(dir_path, exist_ok=True)
                     
                     # Read raw content from controller using original path
-                    content = communicator.read_file(macro.path)
+                    content = communicator.read_file(macro.path,
+                                                     max_bytes=communicator.MAX_READ_BYTES)
                     if content is None:
-                        print(f"WARNING: Failed to read content for {macro.path}")
+                        logger.warning("Failed to read content for %s", macro.path)
                         failed_count += 1
                         continue
                     
@@ -284,10 +527,11 @@ class MacroManager:
                     with open(full_local_path, 'w') as f:
                         f.write(content)
                     
-                    print(f"DEBUG: Synced {macro.name} to {full_local_path}")
+                    logger.debug("Synced %s to %s", macro.name, full_local_path)
                     
                     # Update in-memory macro
-                    commands = [line.strip() for line in content.split('\n') if line.strip() and not line.strip().startswith(';')]
+                    stripped = (line.strip() for line in content.split('\n'))
+                    commands = [line for line in stripped if line and not line.startswith(';')]
                     
                     if macro.name in self.macros:
                         # update_macro only accepts specific parameters
@@ -297,7 +541,9 @@ class MacroManager:
                             description=macro.description or f"Synced from controller: {macro.name}",
                             category=macro.category or 'system',
                             color='#e6e6e6',
-                            hotkey=''
+                            hotkey='',
+                            _persist=False,
+                            _timestamp=current_time
                         )
                     else:
                         # create_macro accepts all parameters
@@ -307,25 +553,29 @@ class MacroManager:
                             description=macro.description or f"Synced from controller: {macro.name}",
                             category=macro.category or 'system',
                             color='#e6e6e6',
-                            hotkey=''
+                            hotkey='',
+                            _persist=False,
+                            _timestamp=current_time
                         )
                     
+                    changed.add(macro.name)
                     synced_count += 1
                     
                 except Exception as e:
-                    print(f"ERROR: Failed to sync macro {macro.name}: {str(e)}")
+                    logger.error("Failed to sync macro %s: %s", macro.name, e)
                     failed_count += 1
             
+            if changed:
+                self.save_all_macros()
+            
             # Remove local files not present on controller (optional - comment out if not desired)
             # self._cleanup_removed_macros(controller_macros)
             
-            print(f"DEBUG: Sync completed: {synced_count} successful, {failed_count} failed")
+            logger.debug("Sync completed: %d successful, %d failed", synced_count, failed_count)
             return failed_count == 0
             
-        except Exception as e:
-            print(f"ERROR: Failed to sync macros from controller: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Failed to sync macros from controller")
             return False
     
     def sync_bidirectional(self, communicator, controller_dir: Optional[str] = None, epsilon: float = 1.0) -> bool:
@@ -355,7 +605,7 @@ class MacroManager:
             # 1. Determine controller directory
             # ------------------------------------------------------------------
             if controller_dir is None:
-                controller_dir = get_config().get_controller_macros_dir()
+                controller_dir = self._config.get_controller_macros_dir()
             os.makedirs(controller_dir, exist_ok=True)
 
             # ------------------------------------------------------------------
@@ -367,7 +617,7 @@ class MacroManager:
                 host_time = datetime.utcnow().replace(tzinfo=timezone.utc)
                 offset_sec = (ctrl_time - host_time).total_seconds()
                 if abs(offset_sec) > 2:
-                    print(f"WARNING: Controller clock differs by {offset_sec:+.2f}s – compensating during sync")
+                    logger.warning("Controller clock differs by %+.2fs – compensating during sync", offset_sec)
 
             # ------------------------------------------------------------------
             # 2. Gather macro metadata from controller and controller directory
@@ -387,80 +637,97 @@ class MacroManager:
                     'modified': getattr(macro, 'modified', 0)
                 }
 
-            # name -> (data, modified_dt)
-            ctrl_info: Dict[str, Tuple[Dict[str, Any], datetime]] = {}
-            for name, data in controller_macros.items():
-                mod_str = data.get("modified_date") or data.get("modifiedDate") or data.get("modified") or ""
+            # Timestamps are kept as raw strings and only parsed when two copies
+            # actually need comparing.
+            def ctrl_time(mod_str) -> datetime:
                 try:
                     mod_dt = datetime.fromisoformat(mod_str) if mod_str else datetime.utcnow()
                 except Exception:
                     mod_dt = datetime.utcnow()
                 # compensate for offset so comparisons use host clock
-                mod_dt += timedelta(seconds=offset_sec)
-                ctrl_info[name] = (data, mod_dt)
+                return mod_dt + timedelta(seconds=offset_sec)
+
+            def ctrl_dir_time(mod_str: str, path: str) -> datetime:
+                if mod_str:
+                    try:
+                        return datetime.fromisoformat(mod_str)
+                    except ValueError:
+                        logger.warning("Invalid modified_date in %s, using file time", path)
+                return datetime.fromtimestamp(os.path.getmtime(path))
+
+            # With no significant clock skew, identical strings are identical
+            # times and need no parsing.
+            raw_equal_is_same = abs(offset_sec) <= epsilon
+
+            # name -> (data, modified_str)
+            ctrl_info: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+            for name, data in controller_macros.items():
+                mod_str = data.get("modified_date") or data.get("modifiedDate") or data.get("modified") or ""
+                ctrl_info[name] = (data, mod_str)
 
             # Controller directory macros
-            ctrl_dir_info: Dict[str, Tuple[Dict[str, Any], datetime, str]] = {}
-            for fname in os.listdir(controller_dir):
-                if not fname.endswith(".json"):
-                    continue
+            ctrl_dir_info: Dict[str, Tuple[Dict[str, Any], str, str]] = {}
+            for entry in _iter_json_files(controller_dir):
+                fname = entry.name
                 name = fname[:-5]
-                path = os.path.join(controller_dir, fname)
+                path = entry.path
                 try:
-                    with open(path, "r") as f:
-                        data = json.load(f)
-                    mod_str = data.get("modified_date", "")
-                    if mod_str:
-                        mod_dt = datetime.fromisoformat(mod_str)
-                    else:
-                        mod_dt = datetime.fromtimestamp(os.path.getmtime(path))
-                    ctrl_dir_info[name] = (data, mod_dt, path)
+                    with open(path, "rb") as f:
+                        data = _load_json(f.read())
+                    ctrl_dir_info[name] = (data, data.get("modified_date", ""), path)
                 except Exception as e:
-                    print(f"WARNING: Failed to read macro file {fname}: {e}")
+                    logger.warning("Failed to read macro file %s: %s", fname, e)
 
             # ------------------------------------------------------------------
             # 3. Synchronise each macro based on timestamps
             # ------------------------------------------------------------------
             all_names = set(ctrl_info.keys()) | set(ctrl_dir_info.keys())
+            changed = False
             for name in all_names:
                 ctrl_present = name in ctrl_info
                 ctrl_dir_present = name in ctrl_dir_info
 
                 if ctrl_present:
-                    ctrl_data, ctrl_dt = ctrl_info[name]
+                    ctrl_data, ctrl_mod = ctrl_info[name]
                 if ctrl_dir_present:
-                    ctrl_dir_data, ctrl_dir_dt, ctrl_dir_path = ctrl_dir_info[name]
+                    ctrl_dir_data, ctrl_dir_mod, ctrl_dir_path = ctrl_dir_info[name]
 
                 # Both present – compare timestamps
                 if ctrl_present and ctrl_dir_present:
-                    diff = (ctrl_dt - ctrl_dir_dt).total_seconds()
+                    if raw_equal_is_same and ctrl_mod and ctrl_mod == ctrl_dir_mod:
+                        continue
+                    diff = (ctrl_time(ctrl_mod) - ctrl_dir_time(ctrl_dir_mod, ctrl_dir_path)).total_seconds()
                     if abs(diff) <= epsilon:
                         # Same timestamp – nothing to do
                         continue
                     if diff > 0:
-                        print(f"DEBUG: Controller copy of '{name}' is newer. Downloading.")
+                        logger.debug("Controller copy of '%s' is newer. Downloading.", name)
                         self._write_controller_macro(communicator, name, ctrl_data, controller_dir)
                         self._create_or_update_local(ctrl_data)
+                        changed = True
                     else:
-                        print(f"DEBUG: Local copy of '{name}' is newer. Uploading.")
+                        logger.debug("Local copy of '%s' is newer. Uploading.", name)
                         communicator.upload_macro(name, ctrl_dir_data)
                         self._create_or_update_local(ctrl_dir_data)
+                        changed = True
                 elif ctrl_present and not ctrl_dir_present:
-                    print(f"DEBUG: Macro '{name}' found only on controller. Downloading.")
+                    logger.debug("Macro '%s' found only on controller. Downloading.", name)
                     self._write_controller_macro(communicator, name, ctrl_data, controller_dir)
                     self._create_or_update_local(ctrl_data)
+                    changed = True
                 elif ctrl_dir_present and not ctrl_present:
-                    print(f"DEBUG: Macro '{name}' found only locally. Uploading.")
+                    logger.debug("Macro '%s' found only locally. Uploading.", name)
                     communicator.upload_macro(name, ctrl_dir_data)
                     self._create_or_update_local(ctrl_dir_data)
+                    changed = True
 
-            # Refresh in-memory macros from disk to ensure consistency
-            self.load_macros()
-            print("DEBUG: Bidirectional macro sync finished")
+            # In-memory macros were updated during the pass; write them once
+            if changed:
+                self.save_all_macros()
+            logger.debug("Bidirectional macro sync finished")
             return True
-        except Exception as e:
-            import traceback
-            print(f"ERROR: sync_bidirectional failed: {e}\n{traceback.format_exc()}")
+        except Exception:
+            logger.exception("sync_bidirectional failed")
             return False
 
     def _write_controller_macro(self, communicator, name: str, data: Dict[str, Any], controller_dir: str) -> None:
@@ -469,7 +736,7 @@ class MacroManager:
         # Get the relative path of the file on the controller
         path_on_controller = data.get('path')
         if not path_on_controller:
-            print(f"ERROR: Cannot write controller macro '{name}', path is missing in metadata.")
+            logger.error("Cannot write controller macro '%s', path is missing in metadata.", name)
             return
 
         # Construct the full local path, mirroring the controller's structure
@@ -477,12 +744,13 @@ class MacroManager:
         dir_path = os.path.dirname(full_local_path)
 
         try:
-            print(f"DEBUG: Attempting to write controller file to: {full_local_path}")
+            logger.debug("Attempting to write controller file to: %s", full_local_path)
             
             # Read the actual file content from the controller
-            content = communicator.read_file(path_on_controller)
+            content = communicator.read_file(path_on_controller,
+                                             max_bytes=communicator.MAX_READ_BYTES)
             if content is None:
-                print(f"ERROR: Failed to read content of '{path_on_controller}' from controller.")
+                logger.error("Failed to read content of '%s' from controller.", path_on_controller)
                 return
 
             # Ensure the target directory exists
@@ -492,13 +760,13 @@ class MacroManager:
             with open(full_local_path, "w") as f:
                 f.write(content)
                 
-            print(f"DEBUG: Successfully wrote file to {full_local_path}")
+            logger.debug("Successfully wrote file to %s", full_local_path)
 
         except Exception as e:
-            print(f"ERROR: Failed to write macro {name} to {full_local_path}: {e}")
+            logger.error("Failed to write macro %s to %s: %s", name, full_local_path, e)
 
     def _create_or_update_local(self, data: Dict[str, Any]) -> None:
-        """Create or update the macro in the local manager storage."""
+        """Create or update the macro in memory; the caller saves afterwards."""
         name = data.get("name")
         if not name:
             return
@@ -509,7 +777,8 @@ class MacroManager:
                 description=data.get("description", ""),
                 category=data.get("category", "user"),
                 color=data.get("color", "#e6e6e6"),
-                hotkey=data.get("hotkey", "")
+                hotkey=data.get("hotkey", ""),
+                _persist=False
             )
         else:
             self.create_macro(
@@ -518,7 +787,8 @@ class MacroManager:
                 description=data.get("description", ""),
                 category=data.get("category", "user"),
                 color=data.get("color", "#e6e6e6"),
-                hotkey=data.get("hotkey", "")
+                hotkey=data.get("hotkey", ""),
+                _persist=False
             )
 
     def _discover_controller_macros(self, communicator):
@@ -528,41 +798,31 @@ class MacroManager:
             communicator: BBCtrlCommunicator instance
             
         Returns:
-            List of macro objects with name, path, description, category attributes
+            List of ControllerMacro tuples
         """
-        print("DEBUG: Discovering macros on controller using file system methods")
+        logger.debug("Discovering macros on controller using file system methods")
         
         try:
             # Use the communicator's existing _find_macros_recursive method
             # This method already exists and returns the macro data we need
             macros_dict = communicator._find_macros_recursive("Home")
             
-            # Convert the dictionary to a list of objects with the required attributes
-            macro_objects = []
-            for macro_name, macro_data in macros_dict.items():
-                # Create a simple object with the required attributes
-                class MacroInfo:
-                    def __init__(self, name, path, description="", category="user"):
-                        self.name = name
-                        self.path = path
-                        self.description = description
-                        self.category = category
-                
-                macro_obj = MacroInfo(
+            # Convert the dictionary to a list of ControllerMacro tuples
+            macro_objects = [
+                ControllerMacro(
                     name=macro_data.get('name', macro_name),
                     path=macro_data.get('path', ''),
                     description=macro_data.get('description', ''),
                     category=macro_data.get('category', 'user')
                 )
-                macro_objects.append(macro_obj)
+                for macro_name, macro_data in macros_dict.items()
+            ]
             
-            print(f"DEBUG: _discover_controller_macros found {len(macro_objects)} macros")
+            logger.debug("_discover_controller_macros found %d macros", len(macro_objects))
             return macro_objects
             
-        except Exception as e:
-            print(f"ERROR: Failed to discover controller macros: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Failed to discover controller macros")
             return []
 
     def export_macro(self, name: str, filepath: str) -> bool:
@@ -606,7 +866,7 @@ class MacroManager:
     
     def cleanup(self):
         """Clean up any resources used by the macro manager."""
-        print(f"DEBUG: Cleaning up MacroManager for directory: {self.macros_directory}")
+        logger.debug("Cleaning up MacroManager for directory: %s", self.macros_directory)
         # Clear any cached macros
         self.macros.clear()
     
@@ -618,7 +878,8 @@ class MacroManager:
             commands=["G28"],
             description="Home all axes to their limit switches",
             category="homing",
-            color="#4CAF50"
+            color="#4CAF50",
+            _persist=False
         )
         
         # Zero All Coordinates
@@ -627,7 +888,8 @@ class MacroManager:
             commands=["G92 X0 Y0 Z0"],
             description="Set current position as zero for all axes",
             category="system",
-            color="#2196F3"
+            color="#2196F3",
+            _persist=False
         )
         
         # Safe Z Height
@@ -636,7 +898,8 @@ class MacroManager:
             commands=["G91", "G0 Z5", "G90"],
             description="Move Z axis up 5mm to safe height",
             category="system",
-            color="#FF9800"
+            color="#FF9800",
+            _persist=False
         )
         
         # Spindle On
@@ -645,7 +908,8 @@ class MacroManager:
             commands=["M3 S1000"],
             description="Turn on spindle at 1000 RPM",
             category="system",
-            color="#9C27B0"
+            color="#9C27B0",
+            _persist=False
         )
         
         # Spindle Off
@@ -654,7 +918,8 @@ class MacroManager:
             commands=["M5"],
             description="Turn off spindle",
             category="system",
-            color="#F44336"
+            color="#F44336",
+            _persist=False
         )
         
         # Tool Change Position
@@ -670,7 +935,8 @@ class MacroManager:
             ],
             description="Move to tool change position and pause",
             category="tool_change",
-            color="#607D8B"
+            color="#607D8B",
+            _persist=False
         )
         
         # Probe Z
@@ -685,18 +951,26 @@ class MacroManager:
             ],
             description="Probe Z axis and set zero (assumes 0.5mm probe)",
             category="probing",
-            color="#795548"
+            color="#795548",
+            _persist=False
         )
         
-        # Save all default macros
+        # Write each default macro once
         self.save_all_macros()
 
 class MacroRecorder:
     """Records user actions as macros."""
     
-    def __init__(self):
+    __slots__ = ('recording', 'recorded_commands', 'start_time')
+    
+    def __init__(self, max_commands: Optional[int] = None):
+        """
+        Args:
+            max_commands: Optional bound on the recording length. When set, the
+                          oldest commands are dropped once the limit is reached.
+        """
         self.recording = False
-        self.recorded_commands: List[str] = []
+        self.recorded_commands: deque = deque(maxlen=max_commands)
         self.start_time: Optional[datetime] = None
     
     def start_recording(self):
@@ -708,14 +982,15 @@ class MacroRecorder:
     def stop_recording(self) -> List[str]:
         """Stop recording and return the recorded commands."""
         self.recording = False
-        commands = self.recorded_commands.copy()
+        commands = list(self.recorded_commands)
         self.recorded_commands.clear()
         return commands
     
     def add_command(self, command: str):
         """Add a command to the recording."""
         if self.recording:
-            self.recorded_commands.append(command)
+            # Interning lets repeated commands (G90, M114, ...) share one string
+            self.recorded_commands.append(sys.intern(command))
     
     def is_recording(self) -> bool:
         """Check if currently recording."""
@@ -723,24 +998,62 @@ class MacroRecorder:
     
     def get_recorded_commands(self) -> List[str]:
         """Get the currently recorded commands."""
-        return self.recorded_commands.copy()
+        return self.snapshot()
+    
+    def get_recorded_commands_view(self) -> Tuple[str, ...]:
+        """Get an immutable view of the recorded commands for read-only use."""
+        return tuple(self.recorded_commands)
+    
+    def snapshot(self) -> List[str]:
+        """Get a mutable copy of the recorded commands."""
+        return list(self.recorded_commands)
 
 class MacroExecutor:
     """Executes macros with proper timing and error handling."""
     
+    # Minimum seconds between progress callbacks (roughly one 60 Hz frame)
+    PROGRESS_INTERVAL = 0.016
+    
+    __slots__ = ('communicator', 'current_macro', '_status', '_task', '_loop', '_bg_loop',
+                 '_callback_tasks', '_last_progress_t', '_last_progress_pct', 'progress_callback',
+                 'completion_callback', 'error_callback')
+    
     def __init__(self, communicator):
         self.communicator = communicator
-        self.executing = False
         self.current_macro: Optional[Macro] = None
-        self.current_command_index = 0
+        
+        # Execution status, updated in place while a macro runs so polling
+        # readers never trigger a rebuild.
+        self._status: Dict[str, Any] = {
+            "executing": False,
+            "macro_name": "",
+            "current_command_index": 0,
+            "total_commands": 0,
+            "progress_percent": 0,
+        }
+        
+        # Cancellation cancels the running task, which interrupts whichever
+        # send or delay it is awaiting.
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Loop thread used by run_macro_threadsafe, started on first use
+        self._bg_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Running coroutine callbacks, referenced until they finish
+        self._callback_tasks = set()
+        self._last_progress_t = 0.0
+        self._last_progress_pct = -1
         
         # Execution callbacks
-        self.progress_callback: Optional[callable] = None
-        self.completion_callback: Optional[callable] = None
-        self.error_callback: Optional[callable] = None
+        self.progress_callback: Callable = _NOOP
+        self.completion_callback: Callable = _NOOP
+        self.error_callback: Callable = _NOOP
     
     def set_callbacks(self, progress=None, completion=None, error=None):
-        """Set callback functions for macro execution events."""
+        """Set callback functions for macro execution events.
+
+        Callbacks may be plain functions or coroutine functions; the latter
+        are run as tasks on the executing loop.
+        """
         if progress:
             self.progress_callback = progress
         if completion:
@@ -748,68 +1061,297 @@ class MacroExecutor:
         if error:
             self.error_callback = error
     
-    def execute_macro(self, macro: Macro, delay: float = 0.5) -> bool:
-        """Execute a macro with specified delay between commands."""
+    async def execute_macro(self, macro: Macro, delay: float = 0.5) -> bool:
+        """Execute a macro with specified delay between commands.
+
+        This is a coroutine: the pause between commands is awaited so other
+        tasks on the event loop keep running, and the blocking
+        ``communicator.send_gcode`` call is run in the default executor.
+
+        A ``delay`` of 0 (or less) yields to the event loop between commands
+        but does not pace them. If the communicator has a ``ready_event``
+        (a ``threading.Event`` set when the controller acknowledges the
+        command just sent), the next command is sent as soon as it is set
+        and ``delay`` only bounds the wait. :meth:`cancel_execution` cancels the running
+        task, so a cancelled run raises ``asyncio.CancelledError``.
+
+        The completion callback is scheduled on the loop after ``executing``
+        has been cleared, so it runs once this coroutine has returned and may
+        safely start another macro.
+        """
         if self.executing:
             return False
         
-        self.executing = True
         self.current_macro = macro
-        self.current_command_index = 0
+        self._task = asyncio.current_task()
+        self._loop = loop = asyncio.get_running_loop()
+        try:
+            return await self._execute(macro, loop, delay)
+        finally:
+            # The task belongs to the caller; a later cancel_execution must
+            # not cancel whatever it goes on to await
+            self._task = self._loop = None
+
+    async def _execute(self, macro: Macro, loop: asyncio.AbstractEventLoop,
+                       delay: float) -> bool:
+        """Send the macro's commands; the body of :meth:`execute_macro`."""
+        commands = macro.commands
+        total = len(commands)
+        last = total - 1
+        status = self._status
+        status.update(executing=True, macro_name=macro.name, current_command_index=0,
+                      total_commands=total, progress_percent=0)
+        self._last_progress_t = float('-inf')
+        self._last_progress_pct = -1
+        
+        if _groups_cover(macro.groups, total):
+            return await self._execute_groups(macro, loop, delay)
+        
+        # Unpaced macros go out in a single batched write when the
+        # communicator supports it.
+        if delay <= 0 and hasattr(self.communicator, 'send_gcode_batch'):
+            return await self._execute_batch(macro, loop)
+        
+        ready = getattr(self.communicator, 'ready_event', None)
         
         try:
-            for i, command in enumerate(macro.commands):
-                if not self.executing:  # Check for cancellation
-                    break
-                
-                self.current_command_index = i
+            # Pace against absolute deadlines on the loop's monotonic clock so
+            # send latency and wake-up jitter do not accumulate across commands.
+            deadline = loop.time()
+            for i, command in enumerate(commands):
+                status["current_command_index"] = i
                 
-                # Send command
-                if not self.communicator.send_gcode(command):
-                    if self.error_callback:
-                        self.error_callback(f"Failed to send command: {command}")
+                # Send command; only a ready report after this send counts
+                if ready is not None:
+                    ready.clear()
+                sent = await loop.run_in_executor(None, self.communicator.send_gcode, command)
+                if not sent:
+                    self.executing = False
+                    self._report_error(loop, f"Failed to send command: {command}")
                     return False
                 
                 # Update progress
-                if self.progress_callback:
-                    progress = (i + 1) / len(macro.commands) * 100
-                    self.progress_callback(progress, command)
+                progress = ((i + 1) * 100) // total
+                status["progress_percent"] = progress
+                self._report_progress(loop, i == last, progress, command)
                 
                 # Wait between commands (except for last one)
-                if i < len(macro.commands) - 1:
-                    import time
-                    time.sleep(delay)
+                if i < last:
+                    deadline += delay
+                    remaining = deadline - loop.time()
+                    if ready is not None and remaining > 0:
+                        if await loop.run_in_executor(None, ready.wait, remaining):
+                            deadline = loop.time()
+                    else:
+                        # sleep(0) yields to the loop without arming a timer
+                        await asyncio.sleep(remaining if remaining > 0 else 0)
             
             self.executing = False
             
-            if self.completion_callback:
-                self.completion_callback(macro.name)
+            self._schedule(loop, self.completion_callback, macro.name)
             
             return True
             
+        except asyncio.CancelledError:
+            self.executing = False
+            raise
         except Exception as e:
             self.executing = False
-            if self.error_callback:
-                self.error_callback(f"Macro execution error: {e}")
+            self._report_error(loop, f"Macro execution error: {e}")
             return False
+
+    async def _execute_groups(self, macro: Macro, loop: asyncio.AbstractEventLoop,
+                              delay: float) -> bool:
+        """Send each command group concurrently, pacing only between groups."""
+        commands = macro.commands
+        groups = []
+        start = 0
+        for size in macro.groups:
+            groups.append(commands[start:start + size])
+            start += size
+        total = len(commands)
+        last = len(groups) - 1
+        status = self._status
+        status["total_commands"] = total
+        sent_count = 0
+        
+        try:
+            deadline = loop.time()
+            for g, group in enumerate(groups):
+                results = await asyncio.gather(*(self._send_async(c, loop) for c in group))
+                
+                for command, sent in zip(group, results):
+                    if not sent:
+                        self.executing = False
+                        self._report_error(loop, f"Failed to send command: {command}")
+                        return False
+                
+                sent_count += len(group)
+                status["current_command_index"] = sent_count - 1
+                progress = (sent_count * 100) // total
+                status["progress_percent"] = progress
+                if group:
+                    self._report_progress(loop, g == last, progress, group[-1])
+                
+                if g < last:
+                    deadline += delay
+                    remaining = deadline - loop.time()
+                    await asyncio.sleep(remaining if remaining > 0 else 0)
+            
+            self.executing = False
+            
+            self._schedule(loop, self.completion_callback, macro.name)
+            
+            return True
+            
+        except asyncio.CancelledError:
+            self.executing = False
+            raise
+        except Exception as e:
+            self.executing = False
+            self._report_error(loop, f"Macro execution error: {e}")
+            return False
+
+    async def _send_async(self, command: str, loop: asyncio.AbstractEventLoop) -> bool:
+        """Send one command, using the communicator's coroutine API if it has one."""
+        send_async = getattr(self.communicator, 'send_gcode_async', None)
+        if send_async is not None:
+            return await send_async(command)
+        return await loop.run_in_executor(None, self.communicator.send_gcode, command)
+
+    async def _execute_batch(self, macro: Macro, loop: asyncio.AbstractEventLoop) -> bool:
+        """Send all commands with one ``send_gcode_batch`` call.
+
+        The communicator returns one success flag per command; progress is
+        reported from those results once the batch has been submitted.
+        """
+        commands = macro.commands
+        total = len(commands)
+        last = total - 1
+        status = self._status
+        
+        try:
+            results = await loop.run_in_executor(
+                None, self.communicator.send_gcode_batch, list(commands))
+            
+            for i, (command, sent) in enumerate(zip(commands, results)):
+                status["current_command_index"] = i
+                if not sent:
+                    self.executing = False
+                    self._report_error(loop, f"Failed to send command: {command}")
+                    return False
+                
+                progress = ((i + 1) * 100) // total
+                status["progress_percent"] = progress
+                self._report_progress(loop, i == last, progress, command)
+            
+            self.executing = False
+            
+            self._schedule(loop, self.completion_callback, macro.name)
+            
+            return True
+            
+        except asyncio.CancelledError:
+            self.executing = False
+            raise
+        except Exception as e:
+            self.executing = False
+            self._report_error(loop, f"Macro execution error: {e}")
+            return False
+
+    def _report_progress(self, loop: asyncio.AbstractEventLoop, final: bool,
+                         progress: int, command: str) -> None:
+        """Schedule the progress callback, throttled to PROGRESS_INTERVAL.
+
+        ``progress`` is an integer percentage; nothing is reported unless it
+        changed since the last callback. The callback is queued with
+        ``loop.call_soon`` so a slow UI update never delays the next send.
+        The final command is always reported.
+        """
+        if progress == self._last_progress_pct:
+            return
+        now = loop.time()
+        if final or now - self._last_progress_t >= self.PROGRESS_INTERVAL:
+            self._last_progress_t = now
+            self._last_progress_pct = progress
+            self._schedule(loop, self.progress_callback, progress, command)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, callback: Callable, *args) -> None:
+        """Queue a callback on the loop; coroutine functions run as tasks."""
+        if asyncio.iscoroutinefunction(callback):
+            task = loop.create_task(callback(*args))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+        else:
+            loop.call_soon(callback, *args)
+
+    def _report_error(self, loop: asyncio.AbstractEventLoop, message: str) -> None:
+        """Call the error callback, as a task if it is a coroutine function."""
+        if asyncio.iscoroutinefunction(self.error_callback):
+            self._schedule(loop, self.error_callback, message)
+        else:
+            self.error_callback(message)
+
+    async def _execute_and_drain(self, macro: Macro, delay: float) -> bool:
+        """Run :meth:`execute_macro`, then wait for coroutine callbacks it started."""
+        result = await self.execute_macro(macro, delay)
+        # Let call_soon callbacks (and any tasks they create) run first
+        await asyncio.sleep(0)
+        while self._callback_tasks:
+            await asyncio.gather(*self._callback_tasks, return_exceptions=True)
+        return result
+
+    def execute_macro_sync(self, macro: Macro, delay: float = 0.5) -> bool:
+        """Blocking wrapper around :meth:`execute_macro` for legacy callers.
+
+        Returns False if the macro was cancelled.
+        """
+        try:
+            return asyncio.run(self._execute_and_drain(macro, delay))
+        except asyncio.CancelledError:
+            return False
+
+    def run_macro_threadsafe(self, macro: Macro, delay: float = 0.5) -> Future:
+        """Start :meth:`execute_macro` from synchronous code without blocking.
+
+        The macro runs on a background event loop thread owned by this
+        executor. Returns a ``concurrent.futures.Future`` for its result;
+        callbacks are invoked on the loop thread.
+        """
+        loop = self._bg_loop
+        if loop is None or loop.is_closed():
+            loop = self._bg_loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="MacroExecutorLoop",
+                             daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(self.execute_macro(macro, delay), loop)
     
     def cancel_execution(self):
         """Cancel the current macro execution."""
-        self.executing = False
+        task, loop = self._task, self._loop
+        if task is not None and not task.done() and not loop.is_closed():
+            # May be called from another thread (e.g. the UI)
+            loop.call_soon_threadsafe(task.cancel)
     
     def is_executing(self) -> bool:
         """Check if a macro is currently executing."""
         return self.executing
     
+    @property
+    def executing(self) -> bool:
+        return self._status["executing"]
+    
+    @executing.setter
+    def executing(self, value: bool):
+        self._status["executing"] = value
+    
+    @property
+    def current_command_index(self) -> int:
+        return self._status["current_command_index"]
+    
     def get_execution_status(self) -> Dict[str, Any]:
-        """Get the current execution status."""
-        if not self.executing or not self.current_macro:
-            return {"executing": False}
-        
-        return {
-            "executing": True,
-            "macro_name": self.current_macro.name,
-            "current_command_index": self.current_command_index,
-            "total_commands": len(self.current_macro.commands),
-            "progress_percent": (self.current_command_index / len(self.current_macro.commands)) * 100
-        }
+        """Get the current execution status.
+
+        The returned dict is updated live while a macro runs; copy it if a
+        detached snapshot is needed.
+        """
+        return self._status
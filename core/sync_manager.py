@@ -6,28 +6,51 @@ Handles bi-directional synchronization between a local directory and the control
 """
 
 import os
+import json
 import time
+import mmap
+import hashlib
 import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Set
 
-from .communication import Communication
+from .communication import BBCtrlCommunicator
 
 logger = logging.getLogger(__name__)
 
 class SyncManager:
     """Manages the bi-directional synchronization of macros."""
 
-    def __init__(self, comm: Communication, local_sync_dir: str):
+    # Local and remote mtimes of each file as of the last sync
+    STATE_FILE = ".sync_state.json"
+    # Read size for streamed uploads
+    CHUNK_SIZE = 32768
+    # Files at least this large are hashed through mmap instead of read()
+    MMAP_THRESHOLD = 64 * 1024
+
+    def __init__(self, comm: BBCtrlCommunicator, local_sync_dir: str, transfer_workers: int = 8,
+                 verify_hash: bool = False):
         """Initialize the SyncManager.
 
         Args:
             comm: The communication object for controller interaction.
             local_sync_dir: The local directory to synchronize with the controller.
+            transfer_workers: Maximum number of concurrent file transfers.
+            verify_hash: Before transferring a file that exists on both
+                sides, compare content hashes and skip the transfer if they
+                match. The controller has no hash API, so the remote copy is
+                read and hashed; this trades a read for an avoided write.
         """
         self.comm = comm
+        self.transfer_workers = transfer_workers
+        self.verify_hash = verify_hash
         self.local_sync_dir = Path(local_sync_dir)
         os.makedirs(self.local_sync_dir, exist_ok=True)
+        # Relative path -> [local mtime, remote mtime] after the last sync
+        self._state_path = self.local_sync_dir / self.STATE_FILE
+        self._sync_state: Dict[str, List[float]] = self._read_json(self._state_path)
 
     def synchronize_files(self) -> None:
         """Perform a bi-directional synchronization between local and remote files."""
@@ -44,11 +67,23 @@ class SyncManager:
                 logger.error("Synchronization failed: Could not retrieve remote file list.")
                 return
 
+            # Files whose local and remote mtimes both match the last sync
+            # are known to be in sync and need no comparison
+            state = self._sync_state
+            in_sync = {path for path, mtime in local_files.items()
+                       if state.get(path) == [mtime, remote_files.get(path)]}
+
             # Plan the necessary actions
-            actions = self._compare_files(local_files, remote_files)
+            actions = self._compare_files(
+                {path: mtime for path, mtime in local_files.items() if path not in in_sync},
+                {path: mtime for path, mtime in remote_files.items() if path not in in_sync})
+
+            if self.verify_hash:
+                self._drop_identical(actions, local_files, remote_files)
 
             # Execute the plan
-            self._execute_sync_actions(actions)
+            done = self._execute_sync_actions(actions, remote_files)
+            self._update_sync_state(local_files, remote_files, actions, done)
 
             logger.info("File synchronization complete.")
         except Exception as e:
@@ -56,35 +91,61 @@ class SyncManager:
 
     def _get_local_files(self) -> Dict[str, float]:
         """Get a dictionary of local files and their modification times."""
-        local_files = {}
-        for item in self.local_sync_dir.glob('**/*'):
-            if item.is_file():
-                # Use relative path as the key
-                relative_path = item.relative_to(self.local_sync_dir).as_posix()
-                local_files[relative_path] = item.stat().st_mtime
+        base = os.fspath(self.local_sync_dir)
+        base_len = len(base) + len(os.sep)
+        # Use relative path as the key
+        local_files = {path[base_len:].replace(os.sep, '/'): mtime
+                       for path, mtime in self._scan(base)}
         logger.debug(f"Found {len(local_files)} local files.")
         return local_files
 
+    def _scan(self, directory: str):
+        """Yield ``(path, mtime)`` for every non-hidden file under ``directory``.
+
+        Hidden entries (including the sync state files) are never listed remotely,
+        so they are skipped. Entry types come from the directory listing;
+        only files are stat'ed, once, for their mtime.
+        """
+        with os.scandir(directory) as entries:
+            subdirs = []
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat(follow_symlinks=False).st_mtime
+        # Recurse after the listing is closed to keep one open handle
+        for subdir in subdirs:
+            yield from self._scan(subdir)
+
     def _get_remote_files(self, path: str) -> Dict[str, float]:
-        """Recursively get a dictionary of remote files and their modification times."""
-        remote_files = {}
-        listing = self.comm.list_directory(path)
+        """Get a dictionary of remote files and their modification times.
 
-        if listing is None:
+        The tree is walked breadth first; the directories of each level are
+        independent, so they are listed concurrently.
+        """
+        remote_files = {}
+        root = self.comm.list_directory(path)
+        if root is None:
             return None
 
-        for item in listing:
-            name = item.get('name')
-            item_type = item.get('type')
-            full_path = f"{path}/{name}" if path != "Home" else name
-
-            if item_type == 'directory':
-                # Recursively list subdirectories
-                sub_files = self._get_remote_files(full_path)
-                if sub_files is not None:
-                    remote_files.update(sub_files)
-            else:
-                remote_files[full_path] = item.get('modified', 0)
+        level = [(path, root)]
+        with ThreadPoolExecutor(max_workers=self.transfer_workers) as pool:
+            while level:
+                pending = []
+                for dir_path, listing in level:
+                    # Children of Home are keyed without the Home/ prefix
+                    prefix = "" if dir_path == "Home" else dir_path + "/"
+                    for item in listing:
+                        get = item.get
+                        if get('type') == 'directory':
+                            pending.append(prefix + get('name'))
+                        else:
+                            remote_files[prefix + get('name')] = get('modified', 0)
+                listings = pool.map(self.comm.list_directory, pending)
+                level = [(dir_path, listing) for dir_path, listing in zip(pending, listings)
+                         if listing is not None]
         return remote_files
 
     def _compare_files(self, local: Dict[str, float], remote: Dict[str, float]) -> Dict[str, List[str]]:
@@ -119,29 +180,175 @@ class SyncManager:
         logger.info(f"Sync plan: {len(actions['upload'])} to upload, {len(actions['download'])} to download.")
         return actions
 
-    def _execute_sync_actions(self, actions: Dict[str, List[str]]) -> None:
-        """Execute the planned synchronization actions."""
-        # Download files from controller
-        for path in actions['download']:
-            logger.info(f"Downloading: {path}")
-            content = self.comm.read_file(path)
-            if content is not None:
-                local_path = self.local_sync_dir / path
-                os.makedirs(local_path.parent, exist_ok=True)
-                with open(local_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-            else:
-                logger.error(f"Failed to download {path}.")
-
-        # Upload files to controller
+    def _drop_identical(self, actions: Dict[str, List[str]], local: Dict[str, float],
+                        remote: Dict[str, float]) -> None:
+        """Remove planned transfers of files whose content already matches.
+
+        The local copy of each identical file gets the remote mtime, and
+        ``local`` is updated to match, so later syncs see them as in sync.
+        """
+        candidates = [path for path in actions['upload'] + actions['download']
+                      if path in local and path in remote]
+        if not candidates:
+            return
+        with ThreadPoolExecutor(max_workers=self.transfer_workers) as pool:
+            identical = {path for path, same in zip(candidates, pool.map(self._same_content, candidates))
+                         if same}
+        if not identical:
+            return
+        for key in ('upload', 'download'):
+            actions[key] = [path for path in actions[key] if path not in identical]
+        for path in identical:
+            mtime = remote[path]
+            if isinstance(mtime, (int, float)):
+                try:
+                    os.utime(self.local_sync_dir / path, (mtime, mtime))
+                    local[path] = mtime
+                except OSError:
+                    pass
+        logger.info(f"Skipped {len(identical)} transfers of identical files.")
+
+    def _same_content(self, path: str) -> bool:
+        """Check whether the local and remote copies of a file have the same hash."""
+        try:
+            local_hash = self._local_hash(self.local_sync_dir / path)
+        except OSError:
+            return False
+        chunks = self.comm.read_file_stream(path)
+        if chunks is None:
+            return False
+        remote_hash = hashlib.blake2b(digest_size=16)
+        try:
+            for chunk in chunks:
+                remote_hash.update(chunk)
+        except OSError:
+            return False
+        return local_hash == remote_hash.hexdigest()
+
+    def _local_hash(self, path: Path) -> str:
+        """Return the blake2b digest of a local file.
+
+        Large files are hashed straight from a read-only mmap, so no copy of
+        the contents is made; small ones are simply read.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < self.MMAP_THRESHOLD:
+                return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.blake2b(mm, digest_size=16).hexdigest()
+
+    def _execute_sync_actions(self, actions: Dict[str, List[str]],
+                              remote: Optional[Dict[str, float]] = None) -> Set[str]:
+        """Execute the planned synchronization actions.
+
+        Transfers are I/O bound, so they run concurrently on up to
+        ``transfer_workers`` threads. ``remote`` maps paths to their remote
+        mtimes, which downloaded files are given. Returns the paths
+        transferred successfully.
+        """
+        remote = remote or {}
+        done = set()
+        # Create each download directory once, parents first, rather than
+        # once per downloaded file
+        for directory in sorted({os.path.dirname(path) for path in actions['download']}, key=len):
+            if directory:
+                os.makedirs(self.local_sync_dir / directory, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.transfer_workers) as pool:
+            downloads = {pool.submit(self._download_one, path, remote.get(path)): path
+                         for path in actions['download']}
+            uploads = {pool.submit(self._upload_one, path): path for path in actions['upload']}
+            for future in as_completed(downloads):
+                if future.result():
+                    done.add(downloads[future])
+            for future in as_completed(uploads):
+                if future.result():
+                    done.add(uploads[future])
+        return done
+
+    def _update_sync_state(self, local: Dict[str, float], remote: Dict[str, float],
+                           actions: Dict[str, List[str]], done: Set[str]) -> None:
+        """Record the mtimes of files known to be in sync and save them."""
+        state = {path: [local[path], remote[path]] for path in local.keys() & remote.keys()}
+        # An upload changes the remote mtime, which is only known after the
+        # next listing
         for path in actions['upload']:
-            logger.info(f"Uploading: {path}")
-            local_path = self.local_sync_dir / path
-            try:
-                with open(local_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                success, msg = self.comm.write_file(path, content)
-                if not success:
-                    logger.error(f"Failed to upload {path}: {msg}")
-            except FileNotFoundError:
-                logger.error(f"Could not upload {path}: local file not found.")
+            state.pop(path, None)
+        for path in actions['download']:
+            state.pop(path, None)
+            if path in done:
+                try:
+                    state[path] = [os.stat(self.local_sync_dir / path).st_mtime, remote[path]]
+                except OSError:
+                    pass
+        self._sync_state = state
+        self._write_json(self._state_path, state)
+
+    def _download_one(self, path: str, mtime: Optional[float] = None) -> bool:
+        """Download one file from the controller, streaming it to disk.
+
+        The local directory must already exist. The file is streamed into a
+        hidden temporary file beside it, which replaces the local copy only
+        once the last chunk has arrived, so an interrupted download leaves
+        the old copy untouched. The file is given the remote ``mtime`` so the
+        next comparison does not see it as newer locally.
+        """
+        logger.info(f"Downloading: {path}")
+        chunks = self.comm.read_file_stream(path)
+        if chunks is None:
+            logger.error(f"Failed to download {path}.")
+            return False
+        local_path = self.local_sync_dir / path
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=local_path.parent, prefix='.', suffix='.part')
+            with open(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            if isinstance(mtime, (int, float)):
+                os.utime(tmp_path, (time.time(), mtime))
+            os.replace(tmp_path, local_path)
+        except OSError as e:
+            # requests' streaming errors are OSErrors too
+            logger.error(f"Failed to download {path}: {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return False
+        return True
+
+    def _upload_one(self, path: str) -> bool:
+        """Upload one file to the controller, streaming it from disk."""
+        logger.info(f"Uploading: {path}")
+        local_path = self.local_sync_dir / path
+        try:
+            with open(local_path, 'rb') as f:
+                success, msg = self.comm.write_file_stream(
+                    path, iter(lambda: f.read(self.CHUNK_SIZE), b''))
+        except FileNotFoundError:
+            logger.error(f"Could not upload {path}: local file not found.")
+            return False
+        if not success:
+            logger.error(f"Failed to upload {path}: {msg}")
+        return success
+
+    @staticmethod
+    def _read_json(path: Path) -> Dict[str, Any]:
+        """Read a JSON object saved by a previous run, or {} if unavailable."""
+        try:
+            with open(path, 'rb') as f:
+                data = json.loads(f.read())
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]) -> None:
+        """Save a JSON object for the next run."""
+        try:
+            with open(path, 'wb') as f:
+                f.write(json.dumps(data).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not save sync data {path}: {e}")
@@ -1220,9 +1220,11 @@ class MainWindow:
         self._thread_safe_callback(self._log_message, f"Macro '{macro_name}' completed")
 
     def _on_macro_error(self, error):
-        """Handle local macro execution errors."""
-        self._log_message(f"Macro error: {error}", color="red")
-        self._update_progress_display()
+        """Handle macro execution errors."""
+        def update():
+            self._log_message(f"Macro error: {error}", color="red")
+            self._update_progress_display()
+        self._thread_safe_callback(update)
 
     def send_gcode_command(self, command: str) -> bool:
         """Send a G-code command to the controller via MDI.
@@ -211,7 +211,9 @@ class MacroPanel(ttk.LabelFrame):
             # Get main window and execute macro
             main_window = self._get_main_window()
             if main_window and hasattr(main_window, 'macro_executor'):
-                main_window.macro_executor.execute_macro(macro)
+                # Runs on the executor's loop thread; its callbacks are
+                # marshalled back to Tk by the main window
+                main_window.macro_executor.run_macro_threadsafe(macro)
     
     def _get_main_window(self):
         """Get reference to main window."""
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Tests for BBCtrlCommunicator callback dispatch.
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+from unittest.mock import Mock, MagicMock
+
+import websocket
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import communication
+from core.communication import BBCtrlCommunicator
+
+
+def _from_thread(func, *args):
+    thread = threading.Thread(target=func, args=args)
+    thread.start()
+    thread.join()
+
+
+def test_callbacks_from_other_threads_never_block():
+    """Callbacks from the reader thread go straight to the scheduler, however many are pending."""
+    scheduled = []
+    comm = BBCtrlCommunicator(host="localhost", port=8080,
+                              callback_scheduler=lambda func, *args: scheduled.append((func, args)))
+    messages = []
+    comm.set_callbacks(message_callback=messages.append)
+
+    def burst():
+        for i in range(5000):
+            comm._call_callback(comm.message_callback, f"line {i}")
+
+    thread = threading.Thread(target=burst, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert messages == []
+
+    for func, args in scheduled:
+        func(*args)
+    assert len(messages) == 5000
+    assert messages[:2] == ["line 0", "line 1"]
+
+
+def test_state_updates_are_coalesced():
+    """State deltas arriving while a delivery is pending are delivered once."""
+    scheduled = []
+    comm = BBCtrlCommunicator(host="localhost", port=8080,
+                              callback_scheduler=lambda func, *args: scheduled.append((func, args)))
+    comm.STATE_CALLBACK_INTERVAL = 0
+    states = []
+    comm.set_callbacks(state_callback=lambda state: states.append(dict(state)))
+
+    def updates():
+        comm._update_state({"xx": "RUNNING"})
+        comm._update_state({"xp": 1.0})
+        comm._call_callback(comm.state_callback, {"connected": False})
+
+    _from_thread(updates)
+    assert len(scheduled) == 2
+    for func, args in scheduled:
+        func(*args)
+    scheduled.clear()
+    assert states == [{"xx": "RUNNING", "xp": 1.0}, {"connected": False}]
+
+    _from_thread(comm._update_state, {"xp": 2.0})
+    func, args = scheduled.pop()
+    func(*args)
+    assert states[-1] == {"xx": "RUNNING", "xp": 2.0}
+
+
+def test_reconnects_are_rate_limited(monkeypatch):
+    """Failed connections are retried with a growing delay until close()."""
+    attempts = []
+
+    class FakeApp:
+        sock = None
+
+        def __init__(self, url, **callbacks):
+            pass
+
+        def run_forever(self, **options):
+            attempts.append(time.monotonic())
+
+    monkeypatch.setattr(websocket, "WebSocketApp", FakeApp)
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    comm._reconnect_delay = 0.05
+    comm.ws_thread = threading.Thread(target=comm._run_websocket, daemon=True)
+    comm.ws_thread.start()
+
+    deadline = time.monotonic() + 5
+    while len(attempts) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    comm.close()
+
+    assert len(attempts) >= 3
+    assert attempts[2] - attempts[1] >= 0.09
+    assert not comm.ws_thread
+
+
+def test_macro_descriptions_are_cached_by_mtime():
+    """A description is fetched once per file version, reading only its start."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    response = MagicMock(status_code=206)
+    response.__enter__.return_value = response
+    response.iter_content.side_effect = lambda size: iter([b"G28 ; Home all axes\nG0 X0\n"])
+    comm.session.get = Mock(return_value=response)
+
+    assert comm._get_macro_description("Home/home.gcode", 5) == "Home all axes"
+    assert comm._get_macro_description("Home/home.gcode", 5) == "Home all axes"
+    assert comm.session.get.call_count == 1
+    assert "Range" in comm.session.get.call_args.kwargs["headers"]
+
+    comm._get_macro_description("Home/home.gcode", 6)
+    assert comm.session.get.call_count == 2
+
+
+def test_find_macros_walks_subdirectories():
+    """Macros are found in every visible directory, the newest copy winning."""
+    listings = {
+        "Home": [{"name": "Probe", "dir": True}, {"name": ".Trash", "dir": True},
+                 {"name": "park.gcode", "modified": 3}, {"name": "notes.txt"}],
+        "Home/Probe": [{"name": "z_probe.nc", "modified": 1}, {"name": "park.gcode", "modified": 4}],
+    }
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    comm._list_directory = Mock(side_effect=lambda path: listings[path])
+    comm._get_macro_description = Mock(side_effect=lambda path, modified: path)
+
+    macros = comm._find_macros_recursive("Home")
+    assert set(macros) == {"park", "z_probe"}
+    assert macros["park"]["path"] == macros["park"]["description"] == "Home/Probe/park.gcode"
+    assert macros["z_probe"]["category"] == "Probe"
+    assert comm._get_macro_description.call_count == 2
+
+
+def test_merge_state_merges_nested_dicts():
+    """Nested state updates replace leaves and keep untouched keys."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    state = {"xx": "READY", "axes": {"x": {"pos": 0, "homed": True}}}
+    comm._merge_state(state, {"axes": {"x": {"pos": 5}, "y": {"pos": 1}}, "xx": "RUNNING"})
+    assert state == {"xx": "RUNNING", "axes": {"x": {"pos": 5, "homed": True}, "y": {"pos": 1}}}
+
+
+def test_heartbeats_poll_state_without_merging(monkeypatch):
+    """Heartbeat frames are reported and trigger a state poll, not a merge."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    messages = []
+    comm.set_callbacks(message_callback=messages.append)
+    comm._request_state = Mock()
+    loads = Mock(side_effect=json.loads)
+    monkeypatch.setattr(communication, "_loads", loads)
+
+    comm._on_message(None, b'{"heartbeat":42}')
+    comm._on_message(None, '{"heartbeat":43}')
+    assert loads.call_count == 0
+    comm._on_message(None, b'{"heartbeat" : 44}')
+    assert loads.call_count == 1
+
+    assert messages == ["Heartbeat: 42", "Heartbeat: 43", "Heartbeat: 44"]
+    assert comm._request_state.call_count == 3
+    assert comm.last_state == {}
+
+
+def test_send_gcode_batch_packs_encoded_lines():
+    """Batched commands are sent as newline-terminated bytes, packed into frames."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    comm.connected = True
+    comm.ws = Mock()
+    messages = []
+    comm.set_callbacks(message_callback=messages.append)
+
+    commands = ["G90 ", "G0 X0", "G1 X10 Y10 F1000 ; " + "x" * 60]
+    assert comm.send_gcode_batch(commands) == [True, True, True]
+    assert [c.args[0] for c in comm.ws.send.call_args_list] == [
+        b"G90\nG0 X0\n", commands[2].encode() + b"\n"]
+    assert messages == ["Sent: G90", "Sent: G0 X0", "Sent: " + commands[2]]
+
+
+def test_directory_listings_are_briefly_cached():
+    """Repeated listings within the TTL reuse the first response until a write."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    response = Mock(status_code=200, content=b'{"files": [{"name": "a.gcode"}]}')
+    comm.session.get = Mock(return_value=response)
+    comm.session.put = Mock(return_value=Mock(status_code=200))
+
+    assert comm._list_directory("Home") == [{"name": "a.gcode"}]
+    assert comm._list_directory("Home") == [{"name": "a.gcode"}]
+    assert comm.session.get.call_count == 1
+
+    comm.upload_macro("a", {})
+    comm._list_directory("Home")
+    assert comm.session.get.call_count == 2
+
+
+def test_read_file_respects_max_bytes():
+    """read_file decodes streamed content and refuses files over a given limit."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    comm.MAX_READ_BYTES = 8
+    response = MagicMock(status_code=200)
+    response.__enter__.return_value = response
+    response.iter_content.side_effect = lambda size: iter([b"G0 X0\n", "G1 µ\n".encode()])
+    comm.session.get = Mock(return_value=response)
+
+    assert comm.read_file("Home/a.gcode") == "G0 X0\nG1 µ\n"
+    assert comm.read_file("Home/a.gcode", max_bytes=8) is None
+
+
+def test_state_notifications_are_rate_limited():
+    """Rapid state updates notify once, then once more with the final state."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    states = []
+    comm.set_callbacks(state_callback=states.append)
+
+    for x in range(5):
+        comm._update_state({"xp": x})
+    assert states == [{"xp": 0}]
+
+    deadline = time.monotonic() + 2
+    while len(states) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert states == [{"xp": 0}, {"xp": 4}]
+
+
+def test_ready_event_needs_a_transition_after_send():
+    """Only a return to READY after leaving it acknowledges a sent command."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    comm.connected = True
+    comm.ws = Mock()
+    comm._update_state({"xx": "RUNNING"})
+
+    assert comm.send_gcode("G0 X10")
+    comm._update_state({"xx": "READY"})
+    comm._update_state({"cycle": "mdi", "xp": 1.0})
+    assert not comm.ready_event.is_set()
+
+    comm._update_state({"xx": "RUNNING", "cycle": "mdi"})
+    comm._update_state({"xp": 5.0})
+    assert not comm.ready_event.is_set()
+    comm._update_state({"xx": "READY", "cycle": "idle"})
+    assert comm.ready_event.is_set()
+
+    assert comm.send_gcode("G0 X0")
+    assert not comm.ready_event.is_set()
+
+
+def test_byte_frames_are_decoded():
+    """Text frames delivered as bytes reach the callbacks as str."""
+    comm = BBCtrlCommunicator(host="localhost", port=8080)
+    comm.STATE_CALLBACK_INTERVAL = 0
+    messages = []
+    states = []
+    comm.set_callbacks(message_callback=messages.append, state_callback=states.append)
+
+    comm._on_message(None, b"ok \xc2\xb5")
+    comm._on_message(None, b"bad \xff")
+    comm._on_message(None, b'{"xx": "READY"}')
+
+    assert messages == ["ok µ", "bad �"]
+    assert states == [{"xx": "READY"}]
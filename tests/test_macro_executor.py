@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Tests for MacroExecutor and MacroRecorder.
+"""
+
+import asyncio
+import sys
+import os
+import time
+import threading
+from unittest.mock import Mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.macro_manager import Macro, MacroExecutor, MacroRecorder
+
+
+def _make_macro(commands):
+    return Macro(
+        name="Test",
+        description="",
+        commands=commands,
+        created_date="",
+        modified_date="",
+    )
+
+
+def test_execute_macro_sends_all_commands():
+    """All commands are sent in order and completion is reported."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(return_value=True)
+    completed = []
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(completion=completed.append)
+
+    assert executor.execute_macro_sync(_make_macro(["G90", "G0 X0", "G0 Y0"]), delay=0)
+    assert [c.args[0] for c in comm.send_gcode.call_args_list] == ["G90", "G0 X0", "G0 Y0"]
+    assert completed == ["Test"]
+    assert not executor.is_executing()
+
+
+def test_execute_macro_reports_send_failure():
+    """A failed send stops execution and reports the failing command."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(side_effect=[True, False, True])
+    errors = []
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(error=errors.append)
+
+    assert not executor.execute_macro_sync(_make_macro(["G90", "G0 X0", "G0 Y0"]), delay=0)
+    assert comm.send_gcode.call_count == 2
+    assert errors == ["Failed to send command: G0 X0"]
+    assert not executor.is_executing()
+
+
+def test_recorder_bounded():
+    """A bounded recorder keeps only the most recent commands."""
+    recorder = MacroRecorder(max_commands=2)
+    recorder.start_recording()
+    for command in ("G90", "G0 X0", "G0 Y0"):
+        recorder.add_command(command)
+
+    assert recorder.get_recorded_commands() == ["G0 X0", "G0 Y0"]
+    assert recorder.stop_recording() == ["G0 X0", "G0 Y0"]
+    assert recorder.get_recorded_commands() == []
+
+
+def test_cancel_interrupts_delay():
+    """Cancelling stops execution without waiting out the command delay."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(return_value=True)
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(progress=lambda progress, command: executor.cancel_execution())
+
+    start = time.monotonic()
+    assert not executor.execute_macro_sync(_make_macro(["G90", "G0 X0", "G0 Y0"]), delay=5)
+    assert time.monotonic() - start < 1
+    assert comm.send_gcode.call_count == 1
+    assert not executor.is_executing()
+
+
+def test_unpaced_macro_uses_batch_send():
+    """With no delay, a communicator batch method sends everything at once."""
+    comm = Mock(spec=["send_gcode", "send_gcode_batch"])
+    comm.send_gcode_batch = Mock(side_effect=lambda commands: [True] * len(commands))
+    progress = []
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(progress=lambda percent, command: progress.append(command))
+
+    assert executor.execute_macro_sync(_make_macro(["G90", "G0 X0"]), delay=0)
+    comm.send_gcode_batch.assert_called_once_with(["G90", "G0 X0"])
+    comm.send_gcode.assert_not_called()
+    assert progress == ["G90", "G0 X0"]
+
+
+def test_progress_callbacks_are_throttled():
+    """Rapid progress updates are coalesced but the final one is always sent."""
+    comm = Mock(spec=["send_gcode", "send_gcode_batch"])
+    comm.send_gcode_batch = Mock(side_effect=lambda commands: [True] * len(commands))
+    progress = []
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(progress=lambda percent, command: progress.append(percent))
+
+    assert executor.execute_macro_sync(_make_macro(["G4 P0"] * 1000), delay=0)
+    assert len(progress) < 1000
+    assert progress[-1] == 100
+
+
+def test_grouped_macro_sends_every_group():
+    """Grouped macros send every command, group by group."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(return_value=True)
+    completed = []
+
+    macro = _make_macro(["G90", "M114", "M105", "G0 X0"])
+    macro.groups = [1, 2, 1]
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(completion=completed.append)
+
+    assert executor.execute_macro_sync(macro, delay=0)
+    assert sorted(c.args[0] for c in comm.send_gcode.call_args_list) == sorted(macro.commands)
+    assert completed == ["Test"]
+    assert executor.get_execution_status()["total_commands"] == 4
+
+
+def test_groups_that_do_not_cover_commands_are_ignored():
+    """Stale group lengths fall back to sending the current commands in order."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(return_value=True)
+
+    macro = _make_macro(["G90", "M114", "M105", "G0 X0"])
+    macro.groups = [1, 2, 1]
+    macro.commands = ["G91", "G0 Z5"]
+
+    executor = MacroExecutor(comm)
+    assert executor.execute_macro_sync(macro, delay=0)
+    assert [c.args[0] for c in comm.send_gcode.call_args_list] == ["G91", "G0 Z5"]
+
+    # Metadata from before groups were stored as lengths
+    macro.groups = [["G91"], ["G0 Z5"]]
+    assert executor.execute_macro_sync(macro, delay=0)
+    assert comm.send_gcode.call_count == 4
+
+
+def test_ready_event_replaces_fixed_delay():
+    """A communicator ready report releases the next command before the delay."""
+    comm = Mock(spec=["send_gcode", "ready_event"])
+    comm.ready_event = threading.Event()
+
+    def send(command):
+        comm.ready_event.set()
+        return True
+
+    comm.send_gcode = Mock(side_effect=send)
+
+    executor = MacroExecutor(comm)
+
+    start = time.monotonic()
+    assert executor.execute_macro_sync(_make_macro(["G90", "G0 X0", "G0 Y0"]), delay=5)
+    assert time.monotonic() - start < 1
+    assert comm.send_gcode.call_count == 3
+
+
+def test_run_macro_threadsafe_with_coroutine_callback():
+    """Macros can be started from sync code and report to coroutine callbacks."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(return_value=True)
+    completed = threading.Event()
+
+    async def on_complete(name):
+        completed.set()
+
+    executor = MacroExecutor(comm)
+    executor.set_callbacks(completion=on_complete)
+
+    future = executor.run_macro_threadsafe(_make_macro(["G90", "G0 X0"]), delay=0)
+    assert future.result(timeout=5)
+    assert completed.wait(timeout=5)
+    assert comm.send_gcode.call_count == 2
+
+
+def test_cancel_after_completion_leaves_caller_alone():
+    """Cancelling once a macro has finished does not cancel the task that ran it."""
+    comm = Mock(spec=["send_gcode"])
+    comm.send_gcode = Mock(return_value=True)
+    executor = MacroExecutor(comm)
+
+    async def run():
+        assert await executor.execute_macro(_make_macro(["G90", "G0 X0"]), delay=0)
+        executor.cancel_execution()
+        await asyncio.sleep(0.01)
+        return "finished"
+
+    assert asyncio.run(run()) == "finished"
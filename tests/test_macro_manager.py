@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for MacroManager storage.
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.macro_manager import MacroManager
+
+
+def test_index_round_trip():
+    """Creates, updates and deletes survive a reload from the index."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        assert os.path.exists(os.path.join(manager.meta_directory, "macros.jsonl"))
+
+        manager.create_macro("Probe", ["G38.2 Z-10"], category="probing")
+        manager.create_macro("Probe Twice", ["G38.2 Z-10"] * 2, category="probing")
+        manager.update_macro("Home All", category="user")
+        assert manager.delete_macro("Probe Twice")
+
+        reloaded = MacroManager(directory)
+        assert set(reloaded.macros) == set(manager.macros)
+        assert "Probe Twice" not in reloaded.macros
+        assert reloaded.macros["Probe"].commands == ["G38.2 Z-10"]
+        assert reloaded.macros["Home All"].category == "user"
+
+
+def test_deleted_macros_stay_deleted_without_index():
+    """The per-file fallback does not resurrect a deleted macro."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        manager.create_macro("Probe", ["G38.2 Z-10"], category="probing")
+        assert manager.delete_macro("Probe")
+        os.remove(os.path.join(manager.meta_directory, "macros.jsonl"))
+
+        reloaded = MacroManager(directory)
+        assert "Probe" not in reloaded.macros
+
+
+def test_macros_by_category_follows_updates():
+    """The category lookup reflects category changes and deletions."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        manager.create_macro("A", ["G0 X0"], category="custom")
+        manager.create_macro("B", ["G0 Y0"], category="custom")
+
+        manager.update_macro("A", category="user")
+        manager.delete_macro("B")
+
+        assert manager.get_macros_by_category("custom") == []
+        assert manager.macros["A"] in manager.get_macros_by_category("user")
+
+
+def test_index_is_compacted_when_records_go_stale():
+    """Repeated saves rewrite the index instead of growing it without bound."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        manager.INDEX_COMPACT_STALE = 5
+        index_path = os.path.join(manager.meta_directory, "macros.jsonl")
+
+        for i in range(20):
+            manager.update_macro("Home All", description=f"edit {i}")
+
+        with open(index_path, 'rb') as f:
+            records = sum(1 for line in f if line.strip())
+        assert records - len(manager.macros) <= 5
+        assert MacroManager(directory).macros["Home All"].description == "edit 19"
+
+
+def test_index_is_compacted_on_load(monkeypatch):
+    """An index with many superseded records is rewritten when loaded."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        for i in range(10):
+            manager.update_macro("Home All", description=f"edit {i}")
+
+        monkeypatch.setattr(MacroManager, "INDEX_COMPACT_STALE", 5)
+        reloaded = MacroManager(directory)
+        with open(os.path.join(reloaded.meta_directory, "macros.jsonl"), 'rb') as f:
+            records = sum(1 for line in f if line.strip())
+        assert records == len(reloaded.macros)
+        assert reloaded.macros["Home All"].description == "edit 9"
+
+
+def test_index_append_failure_keeps_every_macro(monkeypatch):
+    """A failed index append rewrites the index, so no macro is lost."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        index_path = os.path.join(manager.meta_directory, "macros.jsonl")
+        real_open = os.open
+
+        def failing_open(path, flags, *args):
+            if path == index_path and flags & os.O_APPEND:
+                raise OSError("disk full")
+            return real_open(path, flags, *args)
+
+        monkeypatch.setattr(os, "open", failing_open)
+        manager.update_macro("Home All", description="edited", _persist=False)
+        assert manager.save_macro("Home All")
+        assert os.path.exists(index_path)
+
+        monkeypatch.setattr(os, "open", real_open)
+        reloaded = MacroManager(directory)
+        assert set(reloaded.macros) == set(manager.macros)
+        assert reloaded.macros["Home All"].description == "edited"
+
+
+def test_torn_index_line_loses_no_macros():
+    """An undecodable index line is skipped instead of discarding the index."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        manager.create_macro("mine", ["G0 X0"])
+        with open(os.path.join(manager.meta_directory, "macros.jsonl"), "ab") as f:
+            f.write(b'{"name": "torn", "descr')
+
+        reloaded = MacroManager(directory)
+        assert set(reloaded.macros) == set(manager.macros)
+        assert len(reloaded.macros) > 1
+
+        reloaded.update_macro("mine", description="after")
+        again = MacroManager(directory)
+        assert set(again.macros) == set(manager.macros)
+        assert again.macros["mine"].description == "after"
+
+
+def test_legacy_metadata_files_are_migrated():
+    """Per-macro files are loaded when there is no index and written into one."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        manager.create_macro("mine", ["G0 X0"])
+        for name in manager.macros:
+            manager.save_macro(name)
+        os.remove(os.path.join(manager.meta_directory, "macros.jsonl"))
+
+        reloaded = MacroManager(directory)
+        assert set(reloaded.macros) == set(manager.macros)
+        assert os.path.exists(os.path.join(reloaded.meta_directory, "macros.jsonl"))
+
+
+def test_updating_commands_clears_groups():
+    """Group lengths are dropped when the commands they describe change."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = MacroManager(directory)
+        manager.create_macro("Query", ["M114", "M105"])
+        manager.macros["Query"].groups = [2]
+
+        manager.update_macro("Query", commands=["M114"])
+        assert manager.macros["Query"].groups is None
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for SyncManager.
+"""
+
+import sys
+import os
+import tempfile
+from unittest.mock import Mock
+
+import requests
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sync_manager import SyncManager
+
+LISTINGS = {
+    "Home": [
+        {"name": "Sub", "type": "directory", "modified": 5},
+        {"name": "a.gcode", "type": "file", "modified": 1},
+    ],
+    "Sub": [
+        {"name": "b.gcode", "type": "file", "modified": 2},
+    ],
+}
+
+
+def _make_comm():
+    comm = Mock()
+    comm.connected = True
+    comm.list_directory = Mock(side_effect=lambda path: LISTINGS[path])
+    comm.read_file_stream = Mock(side_effect=lambda path: iter([b"G0 X0\n"]))
+    comm.write_file_stream = Mock(side_effect=lambda path, chunks: (b"".join(chunks), (True, ""))[1])
+    return comm
+
+
+def test_synchronize_downloads_remote_files():
+    """Remote-only files are downloaded into the local tree."""
+    with tempfile.TemporaryDirectory() as directory:
+        SyncManager(_make_comm(), directory).synchronize_files()
+
+        with open(os.path.join(directory, "Sub", "b.gcode")) as f:
+            assert f.read() == "G0 X0\n"
+        assert os.path.exists(os.path.join(directory, "a.gcode"))
+
+
+def test_remote_edits_in_unchanged_directories_are_downloaded():
+    """A file edited in place on the controller is seen by the next sync."""
+    with tempfile.TemporaryDirectory() as directory:
+        listings = {path: [dict(item) for item in items] for path, items in LISTINGS.items()}
+        comm = _make_comm()
+        comm.list_directory = Mock(side_effect=lambda path: listings[path])
+        SyncManager(comm, directory).synchronize_files()
+        assert comm.read_file_stream.call_count == 2
+
+        # Editing a file does not change its directory's mtime
+        listings["Sub"][0]["modified"] = 10
+        SyncManager(comm, directory).synchronize_files()
+        assert comm.read_file_stream.call_args.args[0] == "Sub/b.gcode"
+        assert os.stat(os.path.join(directory, "Sub", "b.gcode")).st_mtime == 10
+
+
+def test_files_in_sync_are_not_transferred_again():
+    """Downloaded files are known to be in sync and are not sent back."""
+    with tempfile.TemporaryDirectory() as directory:
+        comm = _make_comm()
+        SyncManager(comm, directory).synchronize_files()
+        assert comm.read_file_stream.call_count == 2
+
+        # The downloads are unchanged since the last sync
+        SyncManager(comm, directory).synchronize_files()
+        assert comm.read_file_stream.call_count == 2
+        comm.write_file_stream.assert_not_called()
+
+
+def test_local_only_files_are_uploaded():
+    """Local-only files are streamed to the controller."""
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "new.gcode"), "wb") as f:
+            f.write(b"G1 X1\n")
+        comm = _make_comm()
+        uploaded = {}
+        comm.write_file_stream = Mock(
+            side_effect=lambda path, chunks: (uploaded.__setitem__(path, b"".join(chunks)), (True, ""))[1])
+
+        SyncManager(comm, directory).synchronize_files()
+        assert uploaded == {"new.gcode": b"G1 X1\n"}
+
+
+def test_verify_hash_skips_identical_files():
+    """With verify_hash, a file whose content matches is not transferred."""
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "a.gcode"), "wb") as f:
+            f.write(b"G0 X0\n")
+        comm = _make_comm()
+
+        SyncManager(comm, directory, verify_hash=True).synchronize_files()
+        comm.write_file_stream.assert_not_called()
+        assert os.stat(os.path.join(directory, "a.gcode")).st_mtime == 1
+
+
+def test_downloads_take_the_remote_mtime():
+    """Downloaded files get the remote modification time."""
+    with tempfile.TemporaryDirectory() as directory:
+        SyncManager(_make_comm(), directory).synchronize_files()
+
+        assert os.stat(os.path.join(directory, "a.gcode")).st_mtime == 1
+        assert os.stat(os.path.join(directory, "Sub", "b.gcode")).st_mtime == 2
+
+
+def test_interrupted_download_keeps_local_copy():
+    """A stream that fails part way leaves the old local file as it was."""
+    with tempfile.TemporaryDirectory() as directory:
+        local_path = os.path.join(directory, "a.gcode")
+        with open(local_path, "wb") as f:
+            f.write(b"G0 X0 Y0\n")
+        os.utime(local_path, (0, 0))
+
+        def broken_stream(path):
+            yield b"G0 X"
+            raise requests.exceptions.ChunkedEncodingError("connection reset")
+
+        comm = _make_comm()
+        comm.read_file_stream = Mock(side_effect=broken_stream)
+        manager = SyncManager(comm, directory)
+        assert not manager._download_one("a.gcode", 1)
+
+        with open(local_path, "rb") as f:
+            assert f.read() == b"G0 X0 Y0\n"
+        assert os.stat(local_path).st_mtime == 0
+        assert os.listdir(directory) == ["a.gcode"]